@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0013_moodentry_activities_moodentry_energy_level_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='videocall',
+            index=models.Index(fields=['status', 'actual_start', 'actual_end'], name='videocall_status_times_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations, models
+from django.db.models.functions import ExtractWeekDay
+
+
+WEEKDAY_MOOD_INDEX = models.Index(ExtractWeekDay('date'), 'mood', name='moodentry_weekday_mood_idx')
+
+
+def add_weekday_mood_index(apps, schema_editor):
+    # Built CONCURRENTLY on PostgreSQL so mood logging isn't blocked during deploy
+    MoodEntry = apps.get_model('accounts', 'MoodEntry')
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.add_index(MoodEntry, WEEKDAY_MOOD_INDEX, concurrently=True)
+    else:
+        schema_editor.add_index(MoodEntry, WEEKDAY_MOOD_INDEX)
+
+
+def remove_weekday_mood_index(apps, schema_editor):
+    schema_editor.remove_index(apps.get_model('accounts', 'MoodEntry'), WEEKDAY_MOOD_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('accounts', '0014_videocall_status_times_idx'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name='moodentry', index=WEEKDAY_MOOD_INDEX),
+            ],
+            database_operations=[
+                migrations.RunPython(add_weekday_mood_index, remove_weekday_mood_index),
+            ],
+        ),
+    ]
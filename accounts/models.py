@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import ExtractWeekDay
 from django.utils import timezone
 from allauth.socialaccount.models import SocialAccount
 
@@ -59,6 +60,8 @@ class MoodEntry(models.Model):
             models.Index(fields=['date']),
             models.Index(fields=['user', 'date']),  # For efficient lookups
             models.Index(fields=['-date']),  # For recent entries
+            # Mood by day of week on the analytics page groups on this expression
+            models.Index(ExtractWeekDay('date'), 'mood', name='moodentry_weekday_mood_idx'),
         ]
 
     def __str__(self):
@@ -791,6 +794,12 @@ class VideoCall(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Covers the per-status call duration aggregates in analytics
+            models.Index(fields=['status', 'actual_start', 'actual_end'], name='videocall_status_times_idx'),
+        ]
+
     def __str__(self):
         return f"{self.title} - {self.get_call_type_display()} ({self.get_status_display()})"
 
@@ -0,0 +1,70 @@
+"""Caching of expensive analytics results shared by every viewer."""
+import functools
+import time
+
+from django.core.cache import cache
+
+# Site-wide overview shown on the analytics dashboard and in its export
+DASHBOARD_OVERVIEW_CACHE_KEY = 'dashboard_overview_v1'
+# User and mood totals on the user analytics page
+USER_OVERVIEW_CACHE_KEY = 'user_overview_stats_v1'
+# Mood by day of week on the mood analytics page
+MOOD_BY_WEEKDAY_CACHE_KEY = 'mood_by_weekday_v2'
+# Live counters polled by the dashboard
+REALTIME_METRICS_CACHE_KEY = 'realtime_analytics_v2'
+
+_MISSING = object()
+
+# Per-process copies of results, keyed like the shared cache: key -> (expires_at, value)
+_local_cache = {}
+
+
+def cached_result(key, timeout, lock_timeout=30, wait_seconds=5, local_timeout=None):
+    """Cache a zero-argument function's result under `key` for `timeout` seconds.
+
+    On a miss only the caller that takes `key:lock` recomputes; concurrent
+    callers poll for its result for up to `wait_seconds` before computing it
+    themselves, so an expired entry does not send every request to the
+    database at once.
+
+    With `local_timeout`, each process also keeps the result in memory for
+    that many seconds, so bursts of polls skip the cache round trip too.
+    Deleting `key` does not clear these copies; they only expire.
+    """
+    lock_key = f'{key}:lock'
+
+    def decorator(func):
+        def remember(value):
+            if local_timeout:
+                _local_cache[key] = (time.monotonic() + local_timeout, value)
+            return value
+
+        @functools.wraps(func)
+        def wrapper():
+            if local_timeout:
+                expires_at, value = _local_cache.get(key, (0, None))
+                if expires_at > time.monotonic():
+                    return value
+
+            value = cache.get(key, _MISSING)
+            if value is not _MISSING:
+                return remember(value)
+
+            if not cache.add(lock_key, 1, lock_timeout):
+                deadline = time.monotonic() + wait_seconds
+                while time.monotonic() < deadline:
+                    time.sleep(0.1)
+                    value = cache.get(key, _MISSING)
+                    if value is not _MISSING:
+                        return remember(value)
+                return func()
+
+            try:
+                value = func()
+                cache.set(key, value, timeout)
+                return remember(value)
+            finally:
+                cache.delete(lock_key)
+
+        return wrapper
+    return decorator
@@ -0,0 +1,21 @@
+from django.db.models import Aggregate, FloatField, Func, IntegerField
+
+
+class JSONArrayLength(Func):
+    """Number of elements in a JSON array column, computed by the database"""
+    function = 'JSONB_ARRAY_LENGTH'
+    output_field = IntegerField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, function='JSON_ARRAY_LENGTH', **extra_context)
+
+
+class PercentileCont(Aggregate):
+    """Continuous percentile of a column (PostgreSQL's ordered-set aggregate)"""
+    function = 'PERCENTILE_CONT'
+    name = 'PercentileCont'
+    output_field = FloatField()
+    template = '%(function)s(%(percentile)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+
+    def __init__(self, expression, percentile, **extra):
+        super().__init__(expression, percentile=float(percentile), **extra)
@@ -0,0 +1,58 @@
+"""SQL for the database views behind unmanaged analytics models.
+
+The functions take (apps, schema_editor) so migrations can pass them to
+RunPython directly.
+"""
+
+POSTGRES_MOOD_WEEKLY = """
+CREATE MATERIALIZED VIEW mood_weekly AS
+SELECT ROW_NUMBER() OVER (ORDER BY user_id, week) AS id, *
+FROM (
+    SELECT user_id, date_trunc('week', analysis_date)::date AS week,
+           AVG(mood_score) AS avg_mood, STDDEV_POP(mood_score) AS mood_std, COUNT(*) AS n
+    FROM analytics_moodanalytics
+    GROUP BY 1, 2
+) weekly
+"""
+
+# SQLite has no materialized views; a plain view is always current, and
+# STDDEV_POP is provided by Django's SQLite backend.
+SQLITE_MOOD_WEEKLY = """
+CREATE VIEW mood_weekly AS
+SELECT ROW_NUMBER() OVER (ORDER BY user_id, week) AS id, *
+FROM (
+    SELECT user_id, date(analysis_date, 'weekday 0', '-6 days') AS week,
+           AVG(mood_score) AS avg_mood, STDDEV_POP(mood_score) AS mood_std, COUNT(*) AS n
+    FROM analytics_moodanalytics
+    GROUP BY 1, 2
+) weekly
+"""
+
+
+def create_mood_weekly(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(POSTGRES_MOOD_WEEKLY)
+        # REFRESH ... CONCURRENTLY needs a unique index on the view.
+        schema_editor.execute('CREATE UNIQUE INDEX mood_weekly_user_week ON mood_weekly (user_id, week)')
+    else:
+        schema_editor.execute(SQLITE_MOOD_WEEKLY)
+
+
+def drop_mood_weekly(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP MATERIALIZED VIEW IF EXISTS mood_weekly')
+    else:
+        schema_editor.execute('DROP VIEW IF EXISTS mood_weekly')
+
+
+def sqlite_only(operation):
+    """Run a view helper on SQLite only, e.g. around MoodAnalytics table rebuilds.
+
+    SQLite rebuilds a table to alter it and refuses while a view reads from
+    it, so migrations that alter MoodAnalytics drop mood_weekly first and
+    recreate it afterwards. PostgreSQL alters in place and keeps the view.
+    """
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'sqlite':
+            operation(apps, schema_editor)
+    return run
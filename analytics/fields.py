@@ -0,0 +1,60 @@
+import json
+import zlib
+from types import MappingProxyType
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class CompressedJSONField(models.BinaryField):
+    """JSON value stored zlib-compressed in a binary column.
+
+    For large blobs that are only ever read whole (chart data), this keeps the
+    row small and skips the database-side JSON parsing on every fetch.
+    """
+    compression_level = 3
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return json.loads(zlib.decompress(value))
+
+    def to_python(self, value):
+        if isinstance(value, (bytes, memoryview)):
+            return json.loads(zlib.decompress(value))
+        if isinstance(value, str):
+            return json.loads(value)
+        return value
+
+    def get_prep_value(self, value):
+        if value is None:
+            return None
+        payload = json.dumps(value, cls=DjangoJSONEncoder).encode()
+        return super().get_prep_value(zlib.compress(payload, self.compression_level))
+
+    def value_to_string(self, obj):
+        return json.dumps(self.value_from_object(obj), cls=DjangoJSONEncoder)
+
+
+class ImmutableDefaultJSONField(models.JSONField):
+    """JSONField whose dict/list defaults are shared read-only empties.
+
+    New instances built without a value (e.g. for bulk_create) reuse one
+    MappingProxyType/tuple instead of allocating a fresh container each time.
+    Assign a new dict or list to change the value; the shared default is
+    never mutated.
+    """
+    _EMPTY_MAP = MappingProxyType({})
+    _EMPTY_LIST = ()
+
+    def get_default(self):
+        if self.default is dict:
+            return self._EMPTY_MAP
+        if self.default is list:
+            return self._EMPTY_LIST
+        return super().get_default()
+
+    def get_prep_value(self, value):
+        if isinstance(value, MappingProxyType):
+            value = dict(value)
+        return super().get_prep_value(value)
@@ -26,6 +26,11 @@ class Command(BaseCommand):
             action='store_true',
             help='Generate weekly reports for users',
         )
+        parser.add_argument(
+            '--maintain-partitions',
+            action='store_true',
+            help='Create upcoming and drop expired behavior metrics partitions (PostgreSQL)',
+        )
 
     def handle(self, *args, **options):
         if options['user']:
@@ -67,11 +72,19 @@ class Command(BaseCommand):
             generate_weekly_reports()
             self.stdout.write(self.style.SUCCESS('Report generation completed'))
 
+        elif options['maintain_partitions']:
+            # Roll the monthly behavior metrics partitions forward
+            self.stdout.write('Maintaining behavior metrics partitions...')
+            from analytics.partitions import maintain_behavior_partitions
+            dropped = maintain_behavior_partitions()
+            self.stdout.write(self.style.SUCCESS(f'Partition maintenance completed: {len(dropped)} dropped'))
+
         else:
             # Update analytics for all users
             self.stdout.write('Updating analytics for all users...')
 
-            users = User.objects.all()
+            # Stream users in chunks so memory stays bounded for large user tables
+            users = User.objects.all().only('id', 'username').iterator(chunk_size=1000)
             success_count = 0
             error_count = 0
 
@@ -0,0 +1,37 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.db import migrations
+
+
+# GIN indexes only exist on PostgreSQL; development runs on SQLite, so these
+# are created here instead of in Meta.indexes (SQLite table rebuilds would
+# otherwise try to recreate them with USING gin).
+JSON_GIN_INDEXES = [
+    ('PredictiveInsights', GinIndex(fields=['recommended_actions'], name='pi_rec_actions_gin')),
+    ('RiskAssessment', GinIndex(fields=['risk_factors'], name='ra_risk_factors_gin')),
+    ('BehaviorMetrics', GinIndex(fields=['context'], name='bm_context_gin')),
+]
+
+
+def add_gin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, index in JSON_GIN_INDEXES:
+        schema_editor.add_index(apps.get_model('analytics', model_name), index)
+
+
+def remove_gin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, index in JSON_GIN_INDEXES:
+        schema_editor.remove_index(apps.get_model('analytics', model_name), index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_alter_moodanalytics_options_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_gin_indexes, remove_gin_indexes),
+    ]
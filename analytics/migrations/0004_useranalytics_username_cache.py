@@ -0,0 +1,30 @@
+from django.db import migrations, models
+
+
+def populate_username_cache(apps, schema_editor):
+    UserAnalytics = apps.get_model('analytics', 'UserAnalytics')
+    batch = []
+    for analytics in UserAnalytics.objects.select_related('user').only('id', 'user__username').iterator(chunk_size=5000):
+        analytics.username_cache = analytics.user.username
+        batch.append(analytics)
+        if len(batch) >= 1000:
+            UserAnalytics.objects.bulk_update(batch, ['username_cache'], batch_size=1000)
+            batch = []
+    if batch:
+        UserAnalytics.objects.bulk_update(batch, ['username_cache'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_json_gin_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='useranalytics',
+            name='username_cache',
+            field=models.CharField(blank=True, db_index=True, max_length=150),
+        ),
+        migrations.RunPython(populate_username_cache, migrations.RunPython.noop),
+    ]
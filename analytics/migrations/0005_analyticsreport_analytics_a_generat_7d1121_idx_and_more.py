@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-16 12:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0004_useranalytics_username_cache'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='analyticsreport',
+            index=models.Index(fields=['generated_for', 'report_type', '-created_at'], name='analytics_a_generat_7d1121_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='predictiveinsights',
+            index=models.Index(fields=['user', 'is_active', '-created_at'], name='analytics_p_user_id_106b5e_idx'),
+        ),
+    ]
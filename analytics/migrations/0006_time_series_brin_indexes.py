@@ -0,0 +1,35 @@
+from django.contrib.postgres.indexes import BrinIndex
+from django.db import migrations
+
+
+# PostgreSQL-only, see 0003_json_gin_indexes. BRIN suits these append-only
+# tables whose timestamps grow with insertion order.
+TIME_SERIES_BRIN_INDEXES = [
+    ('BehaviorMetrics', BrinIndex(fields=['period_end'], pages_per_range=32, name='bm_period_end_brin')),
+    ('MLModelMetrics', BrinIndex(fields=['training_date'], pages_per_range=32, name='mlm_training_date_brin')),
+]
+
+
+def add_brin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, index in TIME_SERIES_BRIN_INDEXES:
+        schema_editor.add_index(apps.get_model('analytics', model_name), index)
+
+
+def remove_brin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, index in TIME_SERIES_BRIN_INDEXES:
+        schema_editor.remove_index(apps.get_model('analytics', model_name), index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0005_analyticsreport_analytics_a_generat_7d1121_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_brin_indexes, remove_brin_indexes),
+    ]
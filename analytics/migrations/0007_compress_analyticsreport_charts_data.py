@@ -0,0 +1,62 @@
+from django.db import migrations
+
+import analytics.fields
+
+
+def compress_charts_data(apps, schema_editor):
+    AnalyticsReport = apps.get_model('analytics', 'AnalyticsReport')
+    reports = AnalyticsReport.objects.only('id', 'charts_data').iterator(chunk_size=1000)
+    batch = []
+    for report in reports:
+        report.charts_blob = report.charts_data
+        batch.append(report)
+        if len(batch) >= 1000:
+            AnalyticsReport.objects.bulk_update(batch, ['charts_blob'])
+            batch = []
+    if batch:
+        AnalyticsReport.objects.bulk_update(batch, ['charts_blob'])
+
+
+def decompress_charts_data(apps, schema_editor):
+    AnalyticsReport = apps.get_model('analytics', 'AnalyticsReport')
+    reports = AnalyticsReport.objects.only('id', 'charts_blob').iterator(chunk_size=1000)
+    batch = []
+    for report in reports:
+        report.charts_data = report.charts_blob or {}
+        batch.append(report)
+        if len(batch) >= 1000:
+            AnalyticsReport.objects.bulk_update(batch, ['charts_data'])
+            batch = []
+    if batch:
+        AnalyticsReport.objects.bulk_update(batch, ['charts_data'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0006_time_series_brin_indexes'),
+    ]
+
+    # jsonb cannot be cast to bytea in place, so copy through a new column.
+    operations = [
+        migrations.AddField(
+            model_name='analyticsreport',
+            name='charts_blob',
+            field=analytics.fields.CompressedJSONField(null=True),
+        ),
+        migrations.RunPython(compress_charts_data, decompress_charts_data),
+        migrations.RemoveField(
+            model_name='analyticsreport',
+            name='charts_data',
+        ),
+        migrations.RenameField(
+            model_name='analyticsreport',
+            old_name='charts_blob',
+            new_name='charts_data',
+        ),
+        migrations.AlterField(
+            model_name='analyticsreport',
+            name='charts_data',
+            field=analytics.fields.CompressedJSONField(default=dict),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.7 on 2026-10-16 12:26
+
+import analytics.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0007_compress_analyticsreport_charts_data'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='analyticsreport',
+            name='insights',
+            field=analytics.fields.ImmutableDefaultJSONField(default=list),
+        ),
+        migrations.AlterField(
+            model_name='analyticsreport',
+            name='recommendations',
+            field=analytics.fields.ImmutableDefaultJSONField(default=list),
+        ),
+        migrations.AlterField(
+            model_name='analyticsreport',
+            name='summary_data',
+            field=analytics.fields.ImmutableDefaultJSONField(default=dict),
+        ),
+        migrations.AlterField(
+            model_name='behaviormetrics',
+            name='context',
+            field=analytics.fields.ImmutableDefaultJSONField(default=dict),
+        ),
+        migrations.AlterField(
+            model_name='predictiveinsights',
+            name='data_sources',
+            field=analytics.fields.ImmutableDefaultJSONField(default=list),
+        ),
+        migrations.AlterField(
+            model_name='predictiveinsights',
+            name='recommended_actions',
+            field=analytics.fields.ImmutableDefaultJSONField(default=list),
+        ),
+        migrations.AlterField(
+            model_name='riskassessment',
+            name='crisis_indicators',
+            field=analytics.fields.ImmutableDefaultJSONField(default=list),
+        ),
+        migrations.AlterField(
+            model_name='riskassessment',
+            name='protective_factors',
+            field=analytics.fields.ImmutableDefaultJSONField(default=list),
+        ),
+        migrations.AlterField(
+            model_name='riskassessment',
+            name='risk_factors',
+            field=analytics.fields.ImmutableDefaultJSONField(default=list),
+        ),
+    ]
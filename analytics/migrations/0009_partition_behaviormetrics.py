@@ -0,0 +1,98 @@
+from django.conf import settings
+from django.contrib.postgres.indexes import BrinIndex, GinIndex
+from django.core.management.color import no_style
+from django.db import migrations
+from django.utils import timezone
+
+from analytics.partitions import BEHAVIOR_METRICS_TABLE, create_monthly_partitions
+
+OLD_TABLE = f'{BEHAVIOR_METRICS_TABLE}_unpartitioned'
+ID_SEQUENCE = f'{BEHAVIOR_METRICS_TABLE}_part_id_seq'
+
+
+def partition_behavior_metrics(apps, schema_editor):
+    """Rebuild analytics_behaviormetrics as a table RANGE-partitioned by month on period_end.
+
+    PostgreSQL requires the partition key in the primary key, so the table's
+    key becomes (id, period_end); ids still come from a single sequence.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    BehaviorMetrics = apps.get_model('analytics', 'BehaviorMetrics')
+    user_table = apps.get_model(settings.AUTH_USER_MODEL)._meta.db_table
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {BEHAVIOR_METRICS_TABLE} RENAME TO {OLD_TABLE}')
+        cursor.execute(
+            f'CREATE TABLE {BEHAVIOR_METRICS_TABLE} (LIKE {OLD_TABLE} INCLUDING DEFAULTS) '
+            f'PARTITION BY RANGE (period_end)'
+        )
+        cursor.execute(f'CREATE SEQUENCE {ID_SEQUENCE} OWNED BY {BEHAVIOR_METRICS_TABLE}.id')
+        cursor.execute(
+            f"ALTER TABLE {BEHAVIOR_METRICS_TABLE} ALTER COLUMN id SET DEFAULT nextval('{ID_SEQUENCE}')"
+        )
+
+        cursor.execute(f'CREATE TABLE {BEHAVIOR_METRICS_TABLE}_default PARTITION OF {BEHAVIOR_METRICS_TABLE} DEFAULT')
+        cursor.execute(f'SELECT MIN(period_end) FROM {OLD_TABLE}')
+        oldest = cursor.fetchone()[0]
+        today = timezone.now().date()
+        first_month = min(oldest.date(), today) if oldest else today
+        months = (today.year - first_month.year) * 12 + today.month - first_month.month
+        create_monthly_partitions(cursor, first_month, months + 4)
+
+        cursor.execute(f'INSERT INTO {BEHAVIOR_METRICS_TABLE} SELECT * FROM {OLD_TABLE}')
+        cursor.execute(
+            f"SELECT setval('{ID_SEQUENCE}', COALESCE((SELECT MAX(id) FROM {OLD_TABLE}), 0) + 1, false)"
+        )
+        cursor.execute(f'DROP TABLE {OLD_TABLE}')
+        # Constraint and index names are only free once the old table is gone.
+        cursor.execute(f'ALTER TABLE {BEHAVIOR_METRICS_TABLE} ADD PRIMARY KEY (id, period_end)')
+        cursor.execute(
+            f'ALTER TABLE {BEHAVIOR_METRICS_TABLE} ADD CONSTRAINT {BEHAVIOR_METRICS_TABLE}_user_id_fk '
+            f'FOREIGN KEY (user_id) REFERENCES {user_table} (id) DEFERRABLE INITIALLY DEFERRED'
+        )
+
+    # Indexes on the partitioned parent cascade to every partition.
+    schema_editor.execute(
+        schema_editor._create_index_sql(BehaviorMetrics, fields=[BehaviorMetrics._meta.get_field('user')])
+    )
+    for index in BehaviorMetrics._meta.indexes:
+        schema_editor.add_index(BehaviorMetrics, index)
+    schema_editor.add_index(BehaviorMetrics, GinIndex(fields=['context'], name='bm_context_gin'))
+    schema_editor.add_index(
+        BehaviorMetrics, BrinIndex(fields=['period_end'], pages_per_range=32, name='bm_period_end_brin')
+    )
+
+
+def unpartition_behavior_metrics(apps, schema_editor):
+    """Rebuild analytics_behaviormetrics as the plain table Django creates for the model, keeping its rows"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    BehaviorMetrics = apps.get_model('analytics', 'BehaviorMetrics')
+    columns = ', '.join(field.column for field in BehaviorMetrics._meta.local_concrete_fields)
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'CREATE TEMPORARY TABLE {OLD_TABLE} ON COMMIT DROP AS SELECT * FROM {BEHAVIOR_METRICS_TABLE}')
+        # Drops every partition and the id sequence with it.
+        cursor.execute(f'DROP TABLE {BEHAVIOR_METRICS_TABLE}')
+    schema_editor.create_model(BehaviorMetrics)
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {BEHAVIOR_METRICS_TABLE} ({columns}) SELECT {columns} FROM {OLD_TABLE}'
+        )
+        for sql in schema_editor.connection.ops.sequence_reset_sql(no_style(), [BehaviorMetrics]):
+            cursor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('analytics', '0008_alter_analyticsreport_insights_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_behavior_metrics, unpartition_behavior_metrics),
+    ]
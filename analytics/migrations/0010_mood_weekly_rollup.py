@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+from analytics.db_views import create_mood_weekly, drop_mood_weekly
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0009_partition_behaviormetrics'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_mood_weekly, drop_mood_weekly),
+        migrations.CreateModel(
+            name='MoodWeeklyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week', models.DateField()),
+                ('avg_mood', models.FloatField()),
+                ('mood_std', models.FloatField(null=True)),
+                ('n', models.IntegerField()),
+            ],
+            options={
+                'db_table': 'mood_weekly',
+                'ordering': ['-week'],
+                'managed': False,
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-16 12:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0010_mood_weekly_rollup'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='moodanalytics',
+            name='analytics_m_mood_tr_633b79_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='riskassessment',
+            name='analytics_r_overall_af7c73_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='useranalytics',
+            name='analytics_u_user_id_a24cf9_idx',
+        ),
+        migrations.AddIndex(
+            model_name='moodanalytics',
+            index=models.Index(fields=['mood_trend', '-analysis_date'], name='analytics_m_mood_tr_528661_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='riskassessment',
+            index=models.Index(fields=['overall_risk_level', '-assessment_date'], name='analytics_r_overall_d83cd6_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-16 12:31
+
+from django.db import migrations, models
+
+from analytics.db_views import create_mood_weekly, drop_mood_weekly, sqlite_only
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0011_remove_moodanalytics_analytics_m_mood_tr_633b79_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(sqlite_only(drop_mood_weekly), sqlite_only(create_mood_weekly)),
+        migrations.RemoveIndex(
+            model_name='moodanalytics',
+            name='analytics_m_user_id_daffa7_idx',
+        ),
+        migrations.AlterUniqueTogether(
+            name='moodanalytics',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='moodanalytics',
+            constraint=models.UniqueConstraint(fields=('user', 'analysis_date'), name='mood_user_date_uniq'),
+        ),
+        migrations.RunPython(sqlite_only(create_mood_weekly), sqlite_only(drop_mood_weekly)),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-16 12:35
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def drop_duplicate_personalized_insights(apps, schema_editor):
+    """Keep the oldest row of each (user, insight_type, title) before the unique constraint is added"""
+    PredictiveInsights = apps.get_model('analytics', 'PredictiveInsights')
+    personalized = PredictiveInsights.objects.filter(
+        insight_type__in=['mood_stability', 'engagement', 'emotional_support']
+    )
+    keep_ids = (
+        personalized.values('user', 'insight_type', 'title')
+        .annotate(keep_id=Min('id'))
+        .order_by()
+        .values('keep_id')
+    )
+    personalized.exclude(id__in=keep_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0012_remove_moodanalytics_analytics_m_user_id_daffa7_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_personalized_insights, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='predictiveinsights',
+            constraint=models.UniqueConstraint(condition=models.Q(('insight_type__in', ('mood_stability', 'engagement', 'emotional_support'))), fields=('user', 'insight_type', 'title'), name='insight_user_type_title_uniq'),
+        ),
+    ]
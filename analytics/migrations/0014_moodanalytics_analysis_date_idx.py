@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-16 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0013_predictiveinsights_insight_user_type_title_uniq'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='moodanalytics',
+            index=models.Index(fields=['analysis_date'], name='analytics_m_analysi_158615_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-16 12:44
+
+from django.db import migrations, models
+from django.db.models import Avg, Count
+from django.db.models.functions import Cast
+
+
+def backfill_mood_daily_rollup(apps, schema_editor):
+    """Roll up the existing mood history so the trend chart is complete from the start"""
+    MoodEntry = apps.get_model('accounts', 'MoodEntry')
+    MoodDailyRollup = apps.get_model('analytics', 'MoodDailyRollup')
+    totals = MoodEntry.objects.values('date').annotate(
+        avg_mood=Avg(Cast('mood', models.FloatField())), entry_count=Count('id'),
+    ).order_by()
+    MoodDailyRollup.objects.bulk_create(
+        [MoodDailyRollup(date=row['date'], avg_mood=row['avg_mood'], entry_count=row['entry_count']) for row in totals],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0013_moodentry_activities_moodentry_energy_level_and_more'),
+        ('analytics', '0014_moodanalytics_analysis_date_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MoodDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('avg_mood', models.FloatField(null=True)),
+                ('entry_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['date'],
+            },
+        ),
+        migrations.RunPython(backfill_mood_daily_rollup, migrations.RunPython.noop),
+    ]
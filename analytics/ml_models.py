@@ -6,15 +6,126 @@ from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.metrics import mean_squared_error, accuracy_score, classification_report
 from sklearn.pipeline import Pipeline
 import joblib
+from joblib import parallel_backend
 import os
+from math import sqrt
+from collections import Counter
+from types import MappingProxyType
 from datetime import datetime, timedelta
 from django.conf import settings
+from django.core.cache import cache
+from django.db.models import CharField, Count, Max, Q, Sum, Value
+from django.db.models.functions import Cast
+from django.utils import timezone
 from accounts.models import MoodEntry
+from .db_functions import JSONArrayLength
 from .models import UserAnalytics, MoodAnalytics
 import logging
 
+try:
+    from numba import njit
+except ImportError:  # numba is optional; fall back to plain Python loops
+    def njit(*args, **kwargs):
+        def decorator(func):
+            return func
+        return decorator
+
 logger = logging.getLogger(__name__)
 
+# Numeric score for each mood choice on MoodEntry; unknown moods count as neutral (3)
+MOOD_MAPPING = {
+    'happy': 5, 'excited': 4, 'calm': 3,
+    'sad': 1, 'anxious': 2, 'angry': 1
+}
+
+# MoodEntry columns the feature builders read; the activities/triggers JSON and
+# gratitude text are never needed, so they are left out of the SELECT
+MOOD_FEATURE_FIELDS = ('id', 'mood', 'date', 'note')
+
+# Upper bounds of the predicted-score buckets and the mood label for each bucket
+_MOOD_BOUNDS = np.array([1.5, 2.5, 3.5, 4.5])
+_MOOD_LABELS = np.array(['sad', 'anxious', 'calm', 'excited', 'happy'])
+
+# Part-of-speech tags (adjectives, adverbs, verbs) kept as sentiment keywords
+_KEYWORD_TAGS = frozenset({
+    'JJ', 'JJR', 'JJS', 'RB', 'RBR', 'RBS', 'VB', 'VBD', 'VBG', 'VBN', 'VBP', 'VBZ'
+})
+
+# Sentiment labels indexed by the 'sentiment_id' returned from analyze_sentiment
+_SENTIMENT_LABELS = ('negative', 'neutral', 'positive')
+
+# Shared read-only result for empty text or when TextBlob cannot run
+_DEFAULT_SENTIMENT = MappingProxyType({
+    'sentiment': 'neutral',
+    'sentiment_id': 1,
+    'polarity': 0.0,
+    'subjectivity': 0.0,
+    'confidence': 0.0,
+    'keywords': (),
+    'intensity': 0.0
+})
+
+
+@njit(cache=True, fastmath=True)
+def _rolling_trend_vol(y):
+    """Slope and population std of the trailing 3-score window at each index.
+
+    Matches np.polyfit(range(3), window, 1)[0] and np.std(window); entries
+    with fewer than three prior scores get 0 for both.
+    """
+    n = y.size
+    trend = np.zeros(n)
+    volatility = np.zeros(n)
+    for i in range(3, n):
+        a, b, c = y[i - 2], y[i - 1], y[i]
+        trend[i] = (c - a) * 0.5
+        mean = (a + b + c) / 3
+        volatility[i] = sqrt(((a - mean) ** 2 + (b - mean) ** 2 + (c - mean) ** 2) / 3)
+    return trend, volatility
+
+
+# Risk features are cached per user in the shared Django cache. The key changes
+# with the user's newest mood entry, their analytics row and the day (the
+# features use 30-day windows); the TTL bounds both staleness and size.
+RISK_FEATURES_CACHE_TIMEOUT = 60 * 60
+
+
+def _cached_prepare_features(user):
+    """RiskAssessmentModel.prepare_features for `user`, served from cache while its inputs are unchanged"""
+    state = UserAnalytics.objects.filter(user=user).annotate(
+        latest_mood_id=Max('user__mood_entries__id')
+    ).values_list('updated_at', 'latest_mood_id').first()
+    if state is None:
+        return None  # No analytics yet; prepare_features has nothing to work from
+
+    updated_at, latest_mood_id = state
+    key = f'risk_features:{user.id}:{updated_at.timestamp()}:{latest_mood_id}:{datetime.now().date().isoformat()}'
+    features = cache.get(key)
+    if features is None:
+        features = RiskAssessmentModel().prepare_features(user)
+        if features:
+            cache.set(key, features, RISK_FEATURES_CACHE_TIMEOUT)
+    return features
+
+
+def _values_by_source(**sources):
+    """Read one column from several querysets in a single UNION ALL query.
+
+    Each keyword maps a name to a (queryset, field) pair; returns {name: [values]}.
+    Values come back as text, since the union needs one column type.
+    """
+    selects = [
+        queryset.order_by().annotate(
+            union_source=Value(name, output_field=CharField()),
+            union_value=Cast(field, output_field=CharField()),
+        ).values_list('union_source', 'union_value')
+        for name, (queryset, field) in sources.items()
+    ]
+    values = {name: [] for name in sources}
+    for name, value in selects[0].union(*selects[1:], all=True):
+        values[name].append(value)
+    return values
+
 
 class MoodPredictionModel:
     """Machine learning model for predicting user mood based on historical data"""
@@ -24,28 +135,26 @@ class MoodPredictionModel:
         self.scaler = StandardScaler()
         self.label_encoder = LabelEncoder()
         self.is_trained = False
+        self.feature_order = []
         self.model_path = os.path.join(settings.BASE_DIR, 'analytics', 'models', 'mood_predictor.pkl')
 
     def prepare_data(self, user):
         """Prepare historical mood data for training"""
         # Get mood entries for the user
-        mood_entries = MoodEntry.objects.filter(user=user).order_by('date')
+        mood_entries = MoodEntry.objects.filter(user=user).only(*MOOD_FEATURE_FIELDS).order_by('date')
 
         if len(mood_entries) < 7:  # Need at least a week of data
             return None
 
+        mood_entries = list(mood_entries)
+        mood_scores = np.array([MOOD_MAPPING.get(entry.mood, 3) for entry in mood_entries], dtype=np.float64)
+        mood_trends, mood_volatilities = _rolling_trend_vol(mood_scores)
+
         data = []
         for i, entry in enumerate(mood_entries):
-            # Convert mood to numerical value
-            mood_mapping = {
-                'happy': 5, 'excited': 4, 'calm': 3,
-                'sad': 1, 'anxious': 2, 'angry': 1
-            }
-            mood_score = mood_mapping.get(entry.mood, 3)
-
             # Calculate features
             features = {
-                'mood_score': mood_score,
+                'mood_score': MOOD_MAPPING.get(entry.mood, 3),
                 'day_of_week': entry.date.weekday(),
                 'day_of_month': entry.date.day,
                 'month': entry.date.month,
@@ -55,21 +164,11 @@ class MoodPredictionModel:
 
             # Add previous mood scores (rolling window of 3 days)
             for j in range(1, 4):
-                if i >= j:
-                    prev_mood = mood_entries[i-j]
-                    prev_score = mood_mapping.get(prev_mood.mood, 3)
-                    features[f'prev_mood_{j}'] = prev_score
-                else:
-                    features[f'prev_mood_{j}'] = 3  # Default neutral
+                features[f'prev_mood_{j}'] = int(mood_scores[i-j]) if i >= j else 3  # Default neutral
 
             # Add trend features
-            if i >= 3:
-                recent_moods = [mood_mapping.get(mood_entries[k].mood, 3) for k in range(i-2, i+1)]
-                features['mood_trend'] = np.polyfit(range(3), recent_moods, 1)[0]  # Linear trend
-                features['mood_volatility'] = np.std(recent_moods)
-            else:
-                features['mood_trend'] = 0
-                features['mood_volatility'] = 0
+            features['mood_trend'] = mood_trends[i]
+            features['mood_volatility'] = mood_volatilities[i]
 
             data.append(features)
 
@@ -85,20 +184,27 @@ class MoodPredictionModel:
 
             # Prepare features and target
             feature_cols = [col for col in df.columns if col != 'mood_score']
-            X = df[feature_cols]
-            y = df['mood_score']
+            self.feature_order = list(feature_cols)
+            # Fit on ndarrays so predict_mood can pass ndarrays without feature-name checks
+            X = df[feature_cols].to_numpy(dtype=np.float64)
+            y = df['mood_score'].to_numpy(dtype=np.float64)
 
             # Split data
             X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
-            # Create and train model
+            # Create and train model; per-user histories are small, so a few
+            # shallow-featured trees built in parallel are plenty
             self.model = RandomForestRegressor(
-                n_estimators=100,
+                n_estimators=30,
                 max_depth=10,
+                max_features='sqrt',
+                min_samples_leaf=2,
+                n_jobs=-1,
                 random_state=42
             )
 
-            self.model.fit(X_train, y_train)
+            with parallel_backend('loky'):
+                self.model.fit(X_train, y_train)
 
             # Evaluate
             y_pred = self.model.predict(X_test)
@@ -107,9 +213,9 @@ class MoodPredictionModel:
 
             self.is_trained = True
 
-            # Save model
+            # Save model together with the column order it was fitted on
             os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
-            joblib.dump(self.model, self.model_path)
+            joblib.dump({'model': self.model, 'feature_order': self.feature_order}, self.model_path)
 
             return True
 
@@ -117,25 +223,43 @@ class MoodPredictionModel:
             logger.error(f"Error training mood prediction model: {str(e)}")
             return False
 
+    def load(self):
+        """Load the saved model; returns False when there is none usable (train() has to run)"""
+        if not os.path.exists(self.model_path):
+            return False
+
+        saved = joblib.load(self.model_path)
+        if isinstance(saved, dict):
+            model, feature_order = saved['model'], saved['feature_order']
+        else:
+            # Files written before the column order was saved hold the bare
+            # estimator; one fitted on a DataFrame still knows its columns
+            model = saved
+            feature_order = [str(name) for name in getattr(saved, 'feature_names_in_', ())]
+            if not feature_order:
+                logger.warning(f"Ignoring mood model without feature names: {self.model_path}")
+                return False
+
+        self.model = model
+        self.feature_order = feature_order
+        self.is_trained = True
+        return True
+
     def predict_mood(self, user, prediction_date=None):
         """Predict mood for a given date"""
-        if not self.is_trained:
-            # Try to load existing model
-            if os.path.exists(self.model_path):
-                self.model = joblib.load(self.model_path)
-                self.is_trained = True
-            else:
-                return None
-
         if prediction_date is None:
             prediction_date = datetime.now().date()
 
         try:
+            # Try to load existing model
+            if not self.is_trained and not self.load():
+                return None
+
             # Get recent mood data
             recent_entries = MoodEntry.objects.filter(
                 user=user,
                 date__gte=prediction_date - timedelta(days=7)
-            ).order_by('-date')[:7]
+            ).only('id', 'mood').order_by('-date')[:7]
 
             if len(recent_entries) < 3:
                 return None
@@ -153,22 +277,14 @@ class MoodPredictionModel:
             for j in range(1, 4):
                 if len(recent_entries) > j-1:
                     prev_entry = recent_entries[j-1]
-                    mood_mapping = {
-                        'happy': 5, 'excited': 4, 'calm': 3,
-                        'sad': 1, 'anxious': 2, 'angry': 1
-                    }
-                    features[f'prev_mood_{j}'] = mood_mapping.get(prev_entry.mood, 3)
+                    features[f'prev_mood_{j}'] = MOOD_MAPPING.get(prev_entry.mood, 3)
                 else:
                     features[f'prev_mood_{j}'] = 3
 
             # Calculate trend
             recent_scores = []
             for entry in recent_entries[:3]:
-                mood_mapping = {
-                    'happy': 5, 'excited': 4, 'calm': 3,
-                    'sad': 1, 'anxious': 2, 'angry': 1
-                }
-                recent_scores.append(mood_mapping.get(entry.mood, 3))
+                recent_scores.append(MOOD_MAPPING.get(entry.mood, 3))
 
             if len(recent_scores) >= 3:
                 features['mood_trend'] = np.polyfit(range(len(recent_scores)), recent_scores, 1)[0]
@@ -177,24 +293,13 @@ class MoodPredictionModel:
                 features['mood_trend'] = 0
                 features['mood_volatility'] = 0
 
-            # Make prediction
-            X_pred = pd.DataFrame([features])
+            # Make prediction on a plain ndarray in training column order;
+            # sklearn accepts it directly and we skip DataFrame construction
+            X_pred = np.array([[features[col] for col in self.feature_order]], dtype=np.float64)
             prediction = self.model.predict(X_pred)[0]
 
-            # Convert back to mood category
-            mood_ranges = {
-                (4.5, 6): 'happy',
-                (3.5, 4.5): 'excited',
-                (2.5, 3.5): 'calm',
-                (1.5, 2.5): 'anxious',
-                (0, 1.5): 'sad'
-            }
-
-            for (min_val, max_val), mood in mood_ranges.items():
-                if min_val <= prediction < max_val:
-                    return mood
-
-            return 'calm'  # Default
+            # Convert back to mood category; side='right' keeps the buckets half-open [low, high)
+            return str(_MOOD_LABELS[np.searchsorted(_MOOD_BOUNDS, prediction, side='right')])
 
         except Exception as e:
             logger.error(f"Error predicting mood: {str(e)}")
@@ -212,6 +317,9 @@ class SentimentAnalysisModel:
 
     def analyze_sentiment(self, text):
         """Analyze sentiment of a text message"""
+        if not text or not text.strip():
+            return _DEFAULT_SENTIMENT
+
         try:
             from textblob import TextBlob
 
@@ -220,39 +328,34 @@ class SentimentAnalysisModel:
             polarity = blob.sentiment.polarity  # -1 to 1
             subjectivity = blob.sentiment.subjectivity  # 0 to 1
 
-            # Classify sentiment
-            if polarity > 0.1:
-                sentiment = 'positive'
-            elif polarity < -0.1:
-                sentiment = 'negative'
-            else:
-                sentiment = 'neutral'
-
             # Extract keywords
             keywords = []
             for word, tag in blob.tags:
-                if tag in ['JJ', 'JJR', 'JJS', 'RB', 'RBR', 'RBS', 'VB', 'VBD', 'VBG', 'VBN', 'VBP', 'VBZ']:
+                if tag in _KEYWORD_TAGS:
                     keywords.append(word.lower())
 
-            return {
-                'sentiment': sentiment,
-                'polarity': polarity,
-                'subjectivity': subjectivity,
-                'confidence': abs(polarity),
-                'keywords': keywords[:10],  # Top 10 keywords
-                'intensity': abs(polarity) * subjectivity
-            }
-
-        except Exception as e:
+        except (ImportError, LookupError) as e:
+            # TextBlob is optional and needs NLTK corpora downloaded for tagging
             logger.error(f"Error analyzing sentiment: {str(e)}")
-            return {
-                'sentiment': 'neutral',
-                'polarity': 0.0,
-                'subjectivity': 0.0,
-                'confidence': 0.0,
-                'keywords': [],
-                'intensity': 0.0
-            }
+            return _DEFAULT_SENTIMENT
+
+        # Classify sentiment
+        if polarity > 0.1:
+            sentiment_id = 2
+        elif polarity < -0.1:
+            sentiment_id = 0
+        else:
+            sentiment_id = 1
+
+        return {
+            'sentiment': _SENTIMENT_LABELS[sentiment_id],
+            'sentiment_id': sentiment_id,
+            'polarity': polarity,
+            'subjectivity': subjectivity,
+            'confidence': abs(polarity),
+            'keywords': keywords[:10],  # Top 10 keywords
+            'intensity': abs(polarity) * subjectivity
+        }
 
     def analyze_conversation(self, messages):
         """Analyze sentiment patterns in a conversation"""
@@ -267,10 +370,13 @@ class SentimentAnalysisModel:
         # Calculate aggregate metrics
         avg_polarity = np.mean([s['polarity'] for s in sentiments])
         avg_subjectivity = np.mean([s['subjectivity'] for s in sentiments])
+        sentiment_ids = np.fromiter((s['sentiment_id'] for s in sentiments), dtype=np.int8, count=len(sentiments))
+        negative, neutral, positive = np.bincount(sentiment_ids, minlength=len(_SENTIMENT_LABELS)).tolist()
+        # Keep positive first so ties in dominant_sentiment resolve as before
         sentiment_distribution = {
-            'positive': sum(1 for s in sentiments if s['sentiment'] == 'positive'),
-            'neutral': sum(1 for s in sentiments if s['sentiment'] == 'neutral'),
-            'negative': sum(1 for s in sentiments if s['sentiment'] == 'negative'),
+            'positive': positive,
+            'neutral': neutral,
+            'negative': negative,
         }
 
         # Calculate trend
@@ -324,6 +430,7 @@ class RiskAssessmentModel:
                 user=user,
                 created_at__gte=datetime.now() - timedelta(days=30)
             )
+            chat_sentiments = np.fromiter(chat_analytics.values_list('sentiment_score', flat=True), dtype=np.float64)
 
             # Calculate features
             features = {
@@ -336,30 +443,28 @@ class RiskAssessmentModel:
                 'days_since_last_activity': (datetime.now().date() - analytics.last_activity.date()).days if analytics.last_activity else 30,
             }
 
-            # Mood-based features
-            if recent_moods:
-                mood_scores = []
-                for mood in recent_moods:
-                    mood_mapping = {
-                        'happy': 5, 'excited': 4, 'calm': 3,
-                        'sad': 1, 'anxious': 2, 'angry': 1
-                    }
-                    mood_scores.append(mood_mapping.get(mood.mood, 3))
-
-                features['avg_mood_last_30_days'] = np.mean(mood_scores)
-                features['mood_std_last_30_days'] = np.std(mood_scores)
-                features['negative_mood_ratio'] = sum(1 for score in mood_scores if score <= 2) / len(mood_scores)
+            # Mood-based features, reduced from one int8 array of scores
+            mood_scores = np.fromiter(
+                (MOOD_MAPPING.get(mood, 3) for mood in recent_moods.values_list('mood', flat=True)),
+                dtype=np.int8
+            )
+            if mood_scores.size:
+                features['avg_mood_last_30_days'] = mood_scores.mean()
+                features['mood_std_last_30_days'] = mood_scores.std()
+                features['negative_mood_ratio'] = (mood_scores <= 2).mean()
             else:
                 features['avg_mood_last_30_days'] = 3
                 features['mood_std_last_30_days'] = 0
                 features['negative_mood_ratio'] = 0
 
             # Chat-based features
-            if chat_analytics:
-                avg_sentiment = np.mean([ca.sentiment_score for ca in chat_analytics])
-                features['avg_chat_sentiment'] = avg_sentiment
-                features['negative_chat_ratio'] = sum(1 for ca in chat_analytics if ca.sentiment_score < -0.1) / len(chat_analytics)
-                features['crisis_keywords_count'] = sum(len(ca.crisis_indicators) for ca in chat_analytics)
+            if chat_sentiments.size:
+                features['avg_chat_sentiment'] = chat_sentiments.mean()
+                features['negative_chat_ratio'] = (chat_sentiments < -0.1).mean()
+                # Count crisis indicators in the database rather than decoding every JSON list
+                features['crisis_keywords_count'] = chat_analytics.aggregate(
+                    total=Sum(JSONArrayLength('crisis_indicators'))
+                )['total'] or 0
             else:
                 features['avg_chat_sentiment'] = 0
                 features['negative_chat_ratio'] = 0
@@ -374,7 +479,7 @@ class RiskAssessmentModel:
     def assess_risk(self, user):
         """Assess mental health risk for a user"""
         try:
-            features = self.prepare_features(user)
+            features = _cached_prepare_features(user)
             if not features:
                 return {
                     'risk_level': 'unknown',
@@ -469,17 +574,23 @@ class BehaviorAnalyticsModel:
         try:
             start_date = datetime.now().date() - timedelta(days=days)
 
-            # Get various data points
-            mood_entries = MoodEntry.objects.filter(user=user, date__gte=start_date)
-            chat_sessions = ChatAnalytics.objects.filter(user=user, created_at__gte=start_date)
-            appointments = user.appointments.filter(scheduled_date__gte=start_date)
+            # Get various data points, fetching only the column each analysis reads,
+            # all in one round trip on the request's connection
+            values = _values_by_source(
+                moods=(MoodEntry.objects.filter(user=user, date__gte=start_date), 'mood'),
+                chat_sentiments=(ChatAnalytics.objects.filter(user=user, created_at__gte=start_date), 'sentiment_score'),
+                appointment_statuses=(user.appointments.filter(scheduled_date__gte=start_date), 'status'),
+            )
+            moods = values['moods']
+            chat_sentiments = [float(score) for score in values['chat_sentiments'] if score is not None]
+            appointment_statuses = values['appointment_statuses']
 
             analysis = {
                 'period_days': days,
-                'mood_patterns': self._analyze_mood_patterns(mood_entries),
+                'mood_patterns': self._analyze_mood_patterns(moods),
                 'engagement_patterns': self._analyze_engagement_patterns(user, start_date),
-                'chat_patterns': self._analyze_chat_patterns(chat_sessions),
-                'appointment_patterns': self._analyze_appointment_patterns(appointments),
+                'chat_patterns': self._analyze_chat_patterns(chat_sentiments),
+                'appointment_patterns': self._analyze_appointment_patterns(appointment_statuses),
                 'overall_insights': []
             }
 
@@ -492,29 +603,22 @@ class BehaviorAnalyticsModel:
             logger.error(f"Error analyzing user behavior: {str(e)}")
             return {}
 
-    def _analyze_mood_patterns(self, mood_entries):
-        """Analyze mood entry patterns"""
-        if not mood_entries:
+    def _analyze_mood_patterns(self, moods):
+        """Analyze mood entry patterns from a list of mood values"""
+        if not moods:
             return {'entries_count': 0, 'consistency': 0, 'avg_mood': 3}
 
-        mood_scores = []
-        for entry in mood_entries:
-            mood_mapping = {
-                'happy': 5, 'excited': 4, 'calm': 3,
-                'sad': 1, 'anxious': 2, 'angry': 1
-            }
-            mood_scores.append(mood_mapping.get(entry.mood, 3))
+        mood_scores = [MOOD_MAPPING.get(mood, 3) for mood in moods]
 
         # Calculate consistency (inverse of volatility)
         consistency = 1 / (1 + np.std(mood_scores)) if len(mood_scores) > 1 else 1
 
         return {
-            'entries_count': len(mood_entries),
+            'entries_count': len(moods),
             'consistency': consistency,
             'avg_mood': np.mean(mood_scores),
             'mood_volatility': np.std(mood_scores) if len(mood_scores) > 1 else 0,
-            'most_common_mood': max(set(entry.mood for entry in mood_entries),
-                                   key=lambda x: sum(1 for e in mood_entries if e.mood == x))
+            'most_common_mood': Counter(moods).most_common(1)[0][0]
         }
 
     def _analyze_engagement_patterns(self, user, start_date):
@@ -528,30 +632,30 @@ class BehaviorAnalyticsModel:
             'engagement_trend': 'stable'
         }
 
-    def _analyze_chat_patterns(self, chat_sessions):
-        """Analyze chat behavior patterns"""
-        if not chat_sessions:
+    def _analyze_chat_patterns(self, sentiment_scores):
+        """Analyze chat behavior patterns from per-session sentiment scores"""
+        if not sentiment_scores:
             return {'sessions_count': 0, 'avg_sentiment': 0, 'communication_style': 'minimal'}
 
         return {
-            'sessions_count': len(chat_sessions),
-            'avg_sentiment': np.mean([s.sentiment_score for s in chat_sessions]),
-            'communication_style': 'active' if len(chat_sessions) > 10 else 'moderate',
+            'sessions_count': len(sentiment_scores),
+            'avg_sentiment': np.mean(sentiment_scores),
+            'communication_style': 'active' if len(sentiment_scores) > 10 else 'moderate',
             'sentiment_trend': 'stable'  # Would calculate trend
         }
 
-    def _analyze_appointment_patterns(self, appointments):
-        """Analyze appointment attendance patterns"""
-        if not appointments:
+    def _analyze_appointment_patterns(self, statuses):
+        """Analyze appointment attendance patterns from appointment statuses"""
+        if not statuses:
             return {'total_appointments': 0, 'attendance_rate': 0}
 
-        completed = sum(1 for apt in appointments if apt.status == 'completed')
-        attendance_rate = completed / len(appointments) if appointments else 0
+        completed = statuses.count('completed')
+        attendance_rate = completed / len(statuses)
 
         return {
-            'total_appointments': len(appointments),
+            'total_appointments': len(statuses),
             'attendance_rate': attendance_rate,
-            'upcoming_count': sum(1 for apt in appointments if apt.status == 'scheduled'),
+            'upcoming_count': statuses.count('scheduled'),
             'completion_rate': attendance_rate
         }
 
@@ -575,4 +679,49 @@ class BehaviorAnalyticsModel:
         if appointment_data.get('attendance_rate', 1) < 0.7:
             insights.append("Low appointment attendance rate - follow up may be needed")
 
-        return insights if insights else ["User behavior appears within normal ranges"]
\ No newline at end of file
+        return insights if insights else ["User behavior appears within normal ranges"]
+
+
+def recompute_risk_scores(batch_size=1000):
+    """Recompute UserAnalytics.risk_score for all users in one vectorized pass.
+
+    Applies the same rules as AnalyticsService.update_user_analytics to whole
+    columns at once: +20 for mood volatility above 1.5, +15 for engagement
+    below 30, +25 when over half of the last 30 days' mood entries are sad or
+    angry. Only rows whose score changes are written. Returns that count.
+    """
+    rows = list(
+        UserAnalytics.objects
+        .values_list('id', 'user_id', 'mood_volatility', 'engagement_score', 'risk_score')
+        .order_by('id')
+    )
+    if not rows:
+        return 0
+    ids, user_ids, volatility, engagement, current = (np.array(column) for column in zip(*rows))
+
+    since = timezone.now().date() - timedelta(days=30)
+    mood_counts = np.array(list(
+        MoodEntry.objects.filter(date__gte=since)
+        .values('user_id')
+        .annotate(total=Count('id'), negative=Count('id', filter=Q(mood__in=['sad', 'angry'])))
+        .values_list('user_id', 'total', 'negative')
+        .order_by('user_id')
+    ), dtype=np.int64).reshape(-1, 3)
+
+    negative_ratio = np.zeros(len(ids))
+    if len(mood_counts):
+        position = np.minimum(np.searchsorted(mood_counts[:, 0], user_ids), len(mood_counts) - 1)
+        found = mood_counts[position, 0] == user_ids
+        negative_ratio[found] = mood_counts[position[found], 2] / mood_counts[position[found], 1]
+
+    scores = np.minimum(
+        20.0 * (volatility > 1.5) + 15.0 * (engagement < 30) + 25.0 * (negative_ratio > 0.5),
+        100.0,
+    )
+    changed = scores != current
+    UserAnalytics.objects.bulk_update(
+        [UserAnalytics(id=pk, risk_score=score) for pk, score in zip(ids[changed].tolist(), scores[changed].tolist())],
+        ['risk_score'],
+        batch_size=batch_size,
+    )
+    return int(changed.sum())
@@ -1,13 +1,54 @@
-from django.db import models
-from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.db import connection, models
+from django.db.models import Avg, Count, F, Max, StdDev
+from django.db.models.functions import Cast, Floor
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
+from datetime import timedelta
 import json
+import tempfile
 
-User = get_user_model()
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
+from .db_functions import PercentileCont
+from .fields import CompressedJSONField, ImmutableDefaultJSONField
+
+# Reports larger than this spill from memory to a temporary file while being written
+REPORT_SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+_json_encoder = DjangoJSONEncoder()
+
+def _dump_json(value):
+    if orjson is not None:
+        return orjson.dumps(value, default=_json_encoder.default)
+    return json.dumps(value, cls=DjangoJSONEncoder).encode()
+
+class SelectRelatedManager(models.Manager):
+    """Manager that always joins the given single-valued relations.
+
+    The models using it render a related username in __str__, so joining
+    those rows up front avoids one extra query per row in admin lists and
+    report generation. UserAnalytics keeps its own username_cache instead.
+    """
+
+    def __init__(self, *related_fields):
+        super().__init__()
+        self.related_fields = related_fields
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.related_fields:
+            queryset = queryset.select_related(*self.related_fields)
+        return queryset
 
 class UserAnalytics(models.Model):
     """Model for storing user behavior analytics"""
-    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='analytics')
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='analytics')
+    username_cache = models.CharField(max_length=150, blank=True, db_index=True)  # Denormalized user.username
     mood_entries_count = models.IntegerField(default=0)
     total_sessions = models.IntegerField(default=0)
     total_messages_sent = models.IntegerField(default=0)
@@ -23,20 +64,55 @@ class UserAnalytics(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = models.Manager()
+
     class Meta:
         indexes = [
-            models.Index(fields=['user']),
             models.Index(fields=['engagement_score']),
             models.Index(fields=['risk_score']),
             models.Index(fields=['last_activity']),
         ]
 
     def __str__(self):
-        return f"Analytics for {self.user.username}"
+        return f"Analytics for {self.username_cache or self.user_id}"
+
+    def save(self, *args, **kwargs):
+        if not self.username_cache and self.user_id:
+            self.username_cache = self.user.username
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def claim_for_update(cls, user_ids):
+        """Lock the given users' rows, skipping any another worker already holds (call inside transaction.atomic)"""
+        return cls.objects.select_related(None).select_for_update(skip_locked=True).filter(user_id__in=user_ids)
+
+    @classmethod
+    def engagement_stats(cls):
+        """Engagement/risk summary for dashboards, aggregated in the database"""
+        aggregates = {
+            'avg_engagement': Avg('engagement_score'),
+            'avg_risk': Avg('risk_score'),
+            'max_risk': Max('risk_score'),
+            'mood_volatility_std': StdDev('mood_volatility'),
+        }
+        if connection.vendor == 'postgresql':
+            aggregates['p95_engagement'] = PercentileCont('engagement_score', 0.95)
+        return cls.objects.aggregate(**aggregates)
+
+    @classmethod
+    def risk_histogram(cls, bucket_size=10):
+        """Number of users per risk_score bucket, keyed by bucket start"""
+        rows = (
+            cls.objects.annotate(bucket=Floor(F('risk_score') / bucket_size))
+            .values('bucket')
+            .annotate(count=Count('id'))
+            .order_by('bucket')
+        )
+        return {int(row['bucket']) * bucket_size: row['count'] for row in rows}
 
 class MoodAnalytics(models.Model):
     """Model for mood pattern analysis"""
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='mood_analytics')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='mood_analytics')
     dominant_mood = models.CharField(max_length=20, default='neutral')
     analysis_date = models.DateField(default=timezone.now)
     mood_score = models.FloatField()  # Normalized mood score (0-10)
@@ -52,21 +128,99 @@ class MoodAnalytics(models.Model):
     insights = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = SelectRelatedManager('user')
+
     class Meta:
-        unique_together = ('user', 'analysis_date')
         ordering = ['-analysis_date']
+        constraints = [
+            # Also serves per-user, date-ordered lookups (scanned backwards for newest first)
+            models.UniqueConstraint(fields=['user', 'analysis_date'], name='mood_user_date_uniq'),
+        ]
         indexes = [
-            models.Index(fields=['user', '-analysis_date']),
-            models.Index(fields=['mood_trend']),
+            models.Index(fields=['mood_trend', '-analysis_date']),
             models.Index(fields=['predicted_mood']),
+            # Range deletes of expired rows in cleanup_old_analytics
+            models.Index(fields=['analysis_date']),
         ]
 
     def __str__(self):
         return f"Mood analytics for {self.user.username} on {self.analysis_date}"
 
+    # Columns refreshed by bulk_upsert when the (user, analysis_date) row already exists
+    UPSERT_FIELDS = (
+        'mood_score', 'mood_trend', 'predicted_mood', 'mood_confidence',
+        'factors', 'insights', 'dominant_mood',
+    )
+
+    @classmethod
+    def bulk_upsert(cls, objs, update_fields=UPSERT_FIELDS):
+        """Insert daily mood analytics in batches, updating rows that already exist for (user, analysis_date)"""
+        return cls.objects.bulk_create(
+            objs,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['user', 'analysis_date'],
+            update_fields=list(update_fields),
+        )
+
+class MoodWeeklyRollup(models.Model):
+    """Per-user weekly MoodAnalytics averages, read from the mood_weekly view (see migration 0010)"""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, related_name='+')
+    week = models.DateField()  # Monday of the week
+    avg_mood = models.FloatField()
+    mood_std = models.FloatField(null=True)
+    n = models.IntegerField()
+
+    class Meta:
+        managed = False
+        db_table = 'mood_weekly'
+        ordering = ['-week']
+
+    def __str__(self):
+        return f"Week of {self.week} for user {self.user_id}: {self.avg_mood:.2f}"
+
+    @classmethod
+    def refresh(cls):
+        """Recompute the rollup; a no-op off PostgreSQL, where mood_weekly is a plain view"""
+        if connection.vendor != 'postgresql':
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f'REFRESH MATERIALIZED VIEW CONCURRENTLY {cls._meta.db_table}')
+
+class MoodDailyRollup(models.Model):
+    """Site-wide MoodEntry average and count per day, served to the mood trend chart"""
+    date = models.DateField(unique=True)
+    avg_mood = models.FloatField(null=True)
+    entry_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['date']
+
+    def __str__(self):
+        return f"Moods on {self.date}: {self.entry_count} entries"
+
+    @classmethod
+    def refresh(cls, days=2):
+        """Recompute the rows for the last `days` days (today included) in one grouped query"""
+        from accounts.models import MoodEntry
+
+        since = timezone.now().date() - timedelta(days=days - 1)
+        totals = MoodEntry.objects.filter(date__gte=since).values('date').annotate(
+            avg_mood=Avg(Cast('mood', models.FloatField())), entry_count=Count('id'),
+        ).order_by()
+        rows = [cls(date=row['date'], avg_mood=row['avg_mood'], entry_count=row['entry_count']) for row in totals]
+        cls.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['date'],
+            update_fields=['avg_mood', 'entry_count', 'updated_at'],
+        )
+        return len(rows)
+
 # class ChatAnalytics(models.Model):
 #     """Model for chat message analytics"""
-#     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chat_analytics')
+#     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='chat_analytics')
 #     conversation = models.ForeignKey('messaging.Conversation', on_delete=models.CASCADE, related_name='analytics', null=True, blank=True)
 #     total_messages_sent = models.IntegerField(default=0)
 #     analysis_date = models.DateField(default=timezone.now)
@@ -97,7 +251,7 @@ class MoodAnalytics(models.Model):
 
 class BehaviorMetrics(models.Model):
     """Model for detailed behavior metrics"""
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='behavior_metrics')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='behavior_metrics')
     metric_type = models.CharField(max_length=50, choices=[
         ('login_frequency', 'Login Frequency'),
         ('session_duration', 'Session Duration'),
@@ -112,9 +266,11 @@ class BehaviorMetrics(models.Model):
     metric_unit = models.CharField(max_length=20, default='count')  # count, percentage, hours, etc.
     period_start = models.DateTimeField()
     period_end = models.DateTimeField()
-    context = models.JSONField(default=dict)  # Additional context data
+    context = ImmutableDefaultJSONField(default=dict)  # Additional context data
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = SelectRelatedManager('user')
+
     class Meta:
         indexes = [
             models.Index(fields=['user', 'metric_type', '-period_end']),
@@ -124,9 +280,26 @@ class BehaviorMetrics(models.Model):
     def __str__(self):
         return f"{self.metric_type} for {self.user.username}: {self.metric_value}"
 
+    @classmethod
+    def bulk_insert(cls, objs):
+        """Insert behavior metrics in batches of 2000 rows per statement"""
+        return cls.objects.bulk_create(objs, batch_size=2000)
+
+    @classmethod
+    def export_rows(cls, user, start, end):
+        """Stream a user's metrics in [start, end] as plain dicts, e.g. for AnalyticsReport.write_report_stream"""
+        return (
+            cls.objects.filter(user=user, period_end__range=(start, end))
+            .values('metric_type', 'metric_value', 'metric_unit', 'period_start', 'period_end')
+            .iterator(chunk_size=2000)
+        )
+
+# Insight types generated by AnalyticsService.get_personalized_insights
+PERSONALIZED_INSIGHT_TYPES = ('mood_stability', 'engagement', 'emotional_support')
+
 class PredictiveInsights(models.Model):
     """Model for predictive analytics insights"""
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='predictive_insights')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='predictive_insights')
     insight_type = models.CharField(max_length=50, choices=[
         ('mood_prediction', 'Mood Prediction'),
         ('risk_assessment', 'Risk Assessment'),
@@ -144,16 +317,27 @@ class PredictiveInsights(models.Model):
         ('critical', 'Critical'),
     ], default='low')
     predicted_outcome = models.TextField(blank=True)
-    recommended_actions = models.JSONField(default=list)
-    data_sources = models.JSONField(default=list)  # Sources used for prediction
+    recommended_actions = ImmutableDefaultJSONField(default=list)
+    data_sources = ImmutableDefaultJSONField(default=list)  # Sources used for prediction
     valid_until = models.DateTimeField(null=True, blank=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = SelectRelatedManager('user')
+
     class Meta:
         ordering = ['-created_at']
+        constraints = [
+            # Only the recurring personalized insights are one-per-user; risk alerts may repeat
+            models.UniqueConstraint(
+                fields=['user', 'insight_type', 'title'],
+                condition=models.Q(insight_type__in=PERSONALIZED_INSIGHT_TYPES),
+                name='insight_user_type_title_uniq',
+            ),
+        ]
         indexes = [
             models.Index(fields=['user', '-created_at']),
+            models.Index(fields=['user', 'is_active', '-created_at']),
             models.Index(fields=['insight_type']),
             models.Index(fields=['severity_level']),
             models.Index(fields=['is_active']),
@@ -162,9 +346,16 @@ class PredictiveInsights(models.Model):
     def __str__(self):
         return f"{self.insight_type} for {self.user.username}: {self.title}"
 
+    @classmethod
+    def active_for(cls, user):
+        """Active insights for a list page, newest first, without the wide text/JSON columns"""
+        return cls.objects.select_related(None).filter(user=user, is_active=True).only(
+            'id', 'title', 'insight_type', 'severity_level', 'created_at'
+        )
+
 class RiskAssessment(models.Model):
     """Model for mental health risk assessment"""
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='risk_assessments')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='risk_assessments')
     overall_risk_level = models.CharField(max_length=20, choices=[
         ('low', 'Low'),
         ('moderate', 'Moderate'),
@@ -172,21 +363,23 @@ class RiskAssessment(models.Model):
         ('severe', 'Severe'),
     ], default='low')
     risk_score = models.FloatField(default=0.0)  # 0-100 scale
-    risk_factors = models.JSONField(default=list)
-    protective_factors = models.JSONField(default=list)
-    crisis_indicators = models.JSONField(default=list)
+    risk_factors = ImmutableDefaultJSONField(default=list)
+    protective_factors = ImmutableDefaultJSONField(default=list)
+    crisis_indicators = ImmutableDefaultJSONField(default=list)
     assessment_date = models.DateTimeField(default=timezone.now)
     next_assessment_due = models.DateTimeField(null=True, blank=True)
-    assessor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='conducted_assessments')
+    assessor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='conducted_assessments')
     notes = models.TextField(blank=True)
     follow_up_required = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = SelectRelatedManager('user', 'assessor')
+
     class Meta:
         ordering = ['-assessment_date']
         indexes = [
             models.Index(fields=['user', '-assessment_date']),
-            models.Index(fields=['overall_risk_level']),
+            models.Index(fields=['overall_risk_level', '-assessment_date']),
             models.Index(fields=['follow_up_required']),
         ]
 
@@ -204,23 +397,26 @@ class AnalyticsReport(models.Model):
 
     title = models.CharField(max_length=200)
     report_type = models.CharField(max_length=20, choices=REPORT_TYPES, default='weekly')
-    generated_for = models.ForeignKey(User, on_delete=models.CASCADE, related_name='analytics_reports')
-    generated_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='generated_reports')
+    generated_for = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='analytics_reports')
+    generated_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='generated_reports')
     period_start = models.DateTimeField()
     period_end = models.DateTimeField()
-    summary_data = models.JSONField(default=dict)
-    insights = models.JSONField(default=list)
-    recommendations = models.JSONField(default=list)
-    charts_data = models.JSONField(default=dict)  # Data for visualizations
+    summary_data = ImmutableDefaultJSONField(default=dict)
+    insights = ImmutableDefaultJSONField(default=list)
+    recommendations = ImmutableDefaultJSONField(default=list)
+    charts_data = CompressedJSONField(default=dict)  # Data for visualizations
     file_path = models.FileField(upload_to='analytics_reports/%Y/%m/%d/', null=True, blank=True)
     is_shared = models.BooleanField(default=False)
-    shared_with = models.ManyToManyField(User, related_name='shared_reports', blank=True)
+    shared_with = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='shared_reports', blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = SelectRelatedManager('generated_for', 'generated_by')
+
     class Meta:
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['generated_for', '-created_at']),
+            models.Index(fields=['generated_for', 'report_type', '-created_at']),
             models.Index(fields=['report_type']),
             models.Index(fields=['period_start', 'period_end']),
         ]
@@ -228,6 +424,31 @@ class AnalyticsReport(models.Model):
     def __str__(self):
         return f"{self.report_type} report for {self.generated_for.username}: {self.title}"
 
+    @classmethod
+    def with_shared(cls):
+        """Reports with shared_with users prefetched (M2M, so not joined by the default manager)"""
+        return cls.objects.prefetch_related('shared_with')
+
+    @classmethod
+    def listing_for(cls, user, report_type=None):
+        """Reports for a list page, newest first, without the JSON payload columns"""
+        reports = cls.objects.select_related(None).filter(generated_for=user)
+        if report_type:
+            reports = reports.filter(report_type=report_type)
+        return reports.defer('summary_data', 'insights', 'recommendations', 'charts_data')
+
+    def write_report_stream(self, rows):
+        """Write an iterable of rows to file_path as a JSON array without building it in memory"""
+        with tempfile.SpooledTemporaryFile(max_size=REPORT_SPOOL_MAX_SIZE) as tmp:
+            tmp.write(b'[')
+            for index, row in enumerate(rows):
+                if index:
+                    tmp.write(b',')
+                tmp.write(_dump_json(row))
+            tmp.write(b']')
+            tmp.seek(0)
+            self.file_path.save(f'{self.pk}.json', File(tmp))
+
 class MLModelMetrics(models.Model):
     """Model for tracking ML model performance"""
     model_name = models.CharField(max_length=100)
@@ -259,4 +480,9 @@ class MLModelMetrics(models.Model):
         ]
 
     def __str__(self):
-        return f"{self.model_name} v{self.model_version} - {self.metric_type}: {self.metric_value}"
\ No newline at end of file
+        return f"{self.model_name} v{self.model_version} - {self.metric_type}: {self.metric_value}"
+
+    @classmethod
+    def bulk_insert(cls, objs):
+        """Insert model metrics in batches of 1000 rows per statement"""
+        return cls.objects.bulk_create(objs, batch_size=1000)
\ No newline at end of file
@@ -0,0 +1,44 @@
+"""Statistics over mood score sequences for the batch analytics jobs.
+
+The loop is compiled with numba when it is installed. Without numba the
+statistics come from numpy, and without numpy from the same loop in plain
+Python, so neither is a hard dependency.
+"""
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; fall back to plain Python loops
+    np = None
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; fall back to numpy
+    njit = None
+
+
+def _welford(scores):
+    n = 0
+    mean = 0.0
+    m2 = 0.0
+    for score in scores:
+        n += 1
+        delta = score - mean
+        mean += delta / n
+        m2 += delta * (score - mean)
+    if n == 0:
+        return 0.0, 0.0
+    return mean, m2 / n
+
+
+_compiled_welford = njit(cache=True)(_welford) if njit is not None else None
+
+
+def mood_stats(scores):
+    """Mean and population variance of a sequence of mood scores (1-5)"""
+    if np is None:
+        return _welford(scores)
+    scores = np.asarray(scores, dtype=np.int8)
+    if _compiled_welford is not None:
+        return _compiled_welford(scores)
+    if scores.size == 0:
+        return 0.0, 0.0
+    return float(scores.mean()), float(scores.var())
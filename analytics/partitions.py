@@ -0,0 +1,108 @@
+"""Monthly RANGE partitions of the BehaviorMetrics table on period_end.
+
+PostgreSQL only; the table is converted by migration 0009. Rows outside every
+monthly partition land in the DEFAULT partition, so inserts never fail when
+maintenance is late; the next maintenance run moves them into their month.
+"""
+import logging
+import re
+from datetime import date, timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+BEHAVIOR_METRICS_TABLE = 'analytics_behaviormetrics'
+DEFAULT_PARTITION = f'{BEHAVIOR_METRICS_TABLE}_default'
+PARTITION_NAME = re.compile(r'^bm_(\d{4})_(\d{2})$')
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def add_months(month, count):
+    years, month_index = divmod(month.month - 1 + count, 12)
+    return date(month.year + years, month_index + 1, 1)
+
+
+def partition_name(month):
+    return f'bm_{month:%Y_%m}'
+
+
+def create_monthly_partitions(cursor, start, months):
+    """Create the partitions for `months` months from the month of `start`.
+
+    PostgreSQL refuses to add a partition whose range already has rows in the
+    DEFAULT partition, so for such a month the DEFAULT partition is detached,
+    the month's rows are moved into the new partition and it is re-attached.
+    Run inside a transaction.
+    """
+    month = month_start(start)
+    for _ in range(months):
+        next_month = add_months(month, 1)
+        name = partition_name(month)
+        bounds = [month.isoformat(), next_month.isoformat()]
+        cursor.execute('SELECT to_regclass(%s)', [name])
+        if cursor.fetchone()[0] is None:
+            cursor.execute(
+                f'SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE period_end >= %s AND period_end < %s)',
+                bounds,
+            )
+            stranded = cursor.fetchone()[0]
+            if stranded:
+                cursor.execute(f'ALTER TABLE {BEHAVIOR_METRICS_TABLE} DETACH PARTITION {DEFAULT_PARTITION}')
+            cursor.execute(
+                f"CREATE TABLE {name} PARTITION OF {BEHAVIOR_METRICS_TABLE} "
+                f"FOR VALUES FROM ('{bounds[0]}') TO ('{bounds[1]}')"
+            )
+            if stranded:
+                cursor.execute(
+                    f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} '
+                    f'WHERE period_end >= %s AND period_end < %s RETURNING *) '
+                    f'INSERT INTO {name} SELECT * FROM moved',
+                    bounds,
+                )
+                moved = cursor.rowcount
+                cursor.execute(
+                    f'ALTER TABLE {BEHAVIOR_METRICS_TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT'
+                )
+                logger.info(f'Moved {moved} behavior metrics rows from the default partition to {name}')
+        month = next_month
+
+
+def drop_partitions_before(cursor, cutoff):
+    """Drop monthly partitions that only hold rows older than `cutoff`; returns their names"""
+    cursor.execute(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON pg_inherits.inhparent = parent.oid "
+        "JOIN pg_class child ON pg_inherits.inhrelid = child.oid "
+        "WHERE parent.relname = %s",
+        [BEHAVIOR_METRICS_TABLE],
+    )
+    dropped = []
+    for (name,) in cursor.fetchall():
+        match = PARTITION_NAME.match(name)
+        if not match:
+            continue
+        month = date(int(match.group(1)), int(match.group(2)), 1)
+        if add_months(month, 1) <= cutoff:
+            cursor.execute(f'DROP TABLE {name}')
+            dropped.append(name)
+    return dropped
+
+
+def maintain_behavior_partitions(months_ahead=3, retention_days=180):
+    """Create upcoming monthly partitions and drop the ones past retention"""
+    if connection.vendor != 'postgresql':
+        return []
+
+    today = timezone.now().date()
+    with transaction.atomic(), connection.cursor() as cursor:
+        create_monthly_partitions(cursor, today, months_ahead + 1)
+        dropped = drop_partitions_before(cursor, today - timedelta(days=retention_days))
+
+    if dropped:
+        logger.info(f"Dropped behavior metrics partitions: {', '.join(dropped)}")
+    return dropped
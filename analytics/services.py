@@ -1,7 +1,13 @@
+from django.core.cache import cache
 from django.utils import timezone
+from collections import defaultdict
 from datetime import datetime, timedelta
-from django.db.models import Avg, Count, Q
+from django.db import transaction
+from django.db.models import Avg, Count, Exists, OuterRef, Prefetch, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
+from accounts.models import Achievement, Appointment, MoodEntry, VideoCall
+from .numeric import mood_stats
 from .models import (
     UserAnalytics, MoodAnalytics, BehaviorMetrics,
     PredictiveInsights, RiskAssessment, AnalyticsReport
@@ -12,77 +18,251 @@ import logging
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
+# Numeric score for each mood choice on MoodEntry; unknown moods count as neutral (3)
+MOOD_MAPPING = {
+    'happy': 5, 'excited': 4, 'calm': 3,
+    'sad': 1, 'anxious': 2, 'angry': 1
+}
+
+# Personalized insights are reused until the user's analytics row is recomputed
+PERSONALIZED_INSIGHTS_CACHE_TIMEOUT = 300
+
+
+# UserAnalytics columns recomputed by _apply_user_scores
+USER_SCORE_FIELDS = [
+    'mood_volatility', 'total_sessions', 'total_messages_sent', 'engagement_score',
+    'risk_score', 'last_activity', 'chat_frequency', 'appointment_attendance_rate',
+    'goal_completion_rate',
+]
+
+
+def _apply_user_scores(analytics, moods, chat_counts, appointment_counts, achievement_count, goal_counts, now):
+    """Set the USER_SCORE_FIELDS of a UserAnalytics row from the user's 30-day moods and activity tallies"""
+    if moods:
+        mood_score = MOOD_MAPPING.get
+        _, analytics.mood_volatility = mood_stats([mood_score(mood, 3) for mood in moods])
+
+    mood_counts = {
+        'total': len(moods),
+        'negative': sum(1 for mood in moods if mood in ('sad', 'angry')),
+    }
+
+    analytics.total_sessions = chat_counts['total']
+    analytics.total_messages_sent = chat_counts['messages'] or 0
+
+    # Engagement score calculation
+    engagement_factors = [
+        min(mood_counts['total'] / 30, 1) * 30,  # Mood logging (max 30 points)
+        min(analytics.total_sessions / 20, 1) * 25,  # Chat sessions (max 25 points)
+        min(appointment_counts['completed'] / 10, 1) * 20,  # Appointments (max 20 points)
+        min(achievement_count / 5, 1) * 15,  # Achievements (max 15 points)
+        min(goal_counts['completed'] / 3, 1) * 10,  # Goals (max 10 points)
+    ]
+    analytics.engagement_score = sum(engagement_factors)
+
+    # Risk score (simplified)
+    risk_factors = []
+    if analytics.mood_volatility > 1.5:
+        risk_factors.append(20)
+    if analytics.engagement_score < 30:
+        risk_factors.append(15)
+    if mood_counts['negative'] / max(mood_counts['total'], 1) > 0.5:
+        risk_factors.append(25)
+    analytics.risk_score = min(sum(risk_factors), 100)
+
+    # Other metrics
+    analytics.last_activity = now
+    analytics.chat_frequency = analytics.total_messages_sent / 30 if analytics.total_messages_sent else 0
+    analytics.appointment_attendance_rate = appointment_counts['completed'] / max(appointment_counts['total'], 1)
+    analytics.goal_completion_rate = goal_counts['completed'] / max(goal_counts['total'], 1)
+
+
+def _mood_analytics_fields(mood, predicted_mood=None):
+    """MoodAnalytics field values for a mood compared with its prediction (neutral when absent)"""
+    actual_score = MOOD_MAPPING.get(mood, 3)
+    predicted_score = MOOD_MAPPING.get(predicted_mood, 3) if predicted_mood else 3
+
+    # Determine trend
+    if abs(actual_score - predicted_score) < 0.5:
+        trend = 'stable'
+    elif actual_score > predicted_score:
+        trend = 'improving'
+    else:
+        trend = 'declining'
+
+    return {
+        'mood_score': actual_score,
+        'mood_trend': trend,
+        'predicted_mood': predicted_score,
+        'mood_confidence': 0.8 if predicted_mood else 0.0,
+        'insights': f"Mood was {'better' if trend == 'improving' else 'worse' if trend == 'declining' else 'as expected'} than predicted",
+    }
+
 
 class AnalyticsService:
     """Main service for handling analytics operations"""
 
+    @staticmethod
+    def get_user_analytics():
+        """Per-user analytics rows for export, as a lazy values() queryset"""
+        return UserAnalytics.objects.order_by('user_id').values(
+            'user_id', 'username_cache', 'engagement_score', 'risk_score', 'mood_volatility',
+            'chat_frequency', 'appointment_attendance_rate', 'goal_completion_rate', 'last_activity',
+        )
+
+    @staticmethod
+    def get_mood_analytics():
+        """Daily mood analytics rows for export, as a lazy values() queryset"""
+        return MoodAnalytics.objects.order_by('user_id', 'analysis_date').values(
+            'user_id', 'analysis_date', 'mood_score', 'mood_trend', 'predicted_mood', 'mood_confidence',
+        )
+
+    @staticmethod
+    def prefetch_for_update(users):
+        """Prefetch the related rows update_user_analytics reads, for batch jobs over many users"""
+        thirty_days_ago = timezone.now() - timedelta(days=30)
+        return users.prefetch_related(
+            Prefetch(
+                'mood_entries',
+                queryset=MoodEntry.objects.filter(date__gte=thirty_days_ago.date()).only('id', 'user_id', 'mood'),
+                to_attr='recent_mood_entries',
+            ),
+            Prefetch(
+                'appointments',
+                queryset=Appointment.objects.only('id', 'user_id', 'status'),
+                to_attr='appointment_list',
+            ),
+            'achievements',
+        )
+
     @staticmethod
     def update_user_analytics(user):
         """Update comprehensive analytics for a user"""
         try:
-            analytics, created = UserAnalytics.objects.get_or_create(user=user)
-
-            # Calculate basic metrics
-            now = timezone.now()
-            thirty_days_ago = now - timedelta(days=30)
-
-            # Mood-related metrics
-            mood_entries = user.mood_entries.filter(date__gte=thirty_days_ago.date())
-            if mood_entries:
-                mood_scores = []
-                for entry in mood_entries:
-                    mood_mapping = {
-                        'happy': 5, 'excited': 4, 'calm': 3,
-                        'sad': 1, 'anxious': 2, 'angry': 1
+            with transaction.atomic():
+                analytics = UserAnalytics.claim_for_update([user.id]).first()
+                if analytics is None:
+                    analytics, created = UserAnalytics.objects.get_or_create(user=user)
+                    if not created:
+                        # Another worker holds the row and is already recomputing it
+                        return analytics
+
+                # Calculate basic metrics
+                now = timezone.now()
+                thirty_days_ago = now - timedelta(days=30)
+
+                # Mood-related metrics
+                # Fetched once (or prefetched by batch jobs); the counts below are taken from this list
+                recent_mood_entries = getattr(user, 'recent_mood_entries', None)
+                if recent_mood_entries is not None:
+                    moods = [entry.mood for entry in recent_mood_entries]
+                else:
+                    moods = list(
+                        user.mood_entries.filter(date__gte=thirty_days_ago.date()).values_list('mood', flat=True)
+                    )
+                # Chat-related metrics
+                chat_counts = user.ai_conversations.aggregate(total=Count('id'), messages=Sum('message_count'))
+
+                # Appointment and goal tallies, one query each
+                appointment_list = getattr(user, 'appointment_list', None)
+                if appointment_list is not None:
+                    appointment_counts = {
+                        'total': len(appointment_list),
+                        'completed': sum(1 for apt in appointment_list if apt.status == 'completed'),
                     }
-                    mood_scores.append(mood_mapping.get(entry.mood, 3))
-
-                analytics.mood_volatility = sum((x - sum(mood_scores)/len(mood_scores))**2 for x in mood_scores) / len(mood_scores) if mood_scores else 0
-
-            # Chat-related metrics
-            chat_sessions = user.ai_conversations.all()
-            analytics.total_sessions = chat_sessions.count()
-            analytics.total_messages_sent = sum(conv.message_count for conv in chat_sessions)
-
-            # Engagement score calculation
-            engagement_factors = [
-                min(mood_entries.count() / 30, 1) * 30,  # Mood logging (max 30 points)
-                min(analytics.total_sessions / 20, 1) * 25,  # Chat sessions (max 25 points)
-                min(user.appointments.filter(status='completed').count() / 10, 1) * 20,  # Appointments (max 20 points)
-                min(user.achievements.count() / 5, 1) * 15,  # Achievements (max 15 points)
-                min(user.goals.filter(completed=True).count() / 3, 1) * 10,  # Goals (max 10 points)
-            ]
-            analytics.engagement_score = sum(engagement_factors)
-
-            # Risk score (simplified)
-            risk_factors = []
-            if analytics.mood_volatility > 1.5:
-                risk_factors.append(20)
-            if analytics.engagement_score < 30:
-                risk_factors.append(15)
-            if mood_entries.filter(mood__in=['sad', 'angry']).count() / max(mood_entries.count(), 1) > 0.5:
-                risk_factors.append(25)
-            analytics.risk_score = min(sum(risk_factors), 100)
-
-            # Other metrics
-            analytics.last_activity = now
-            analytics.chat_frequency = analytics.total_messages_sent / 30 if analytics.total_messages_sent else 0
-            analytics.appointment_attendance_rate = user.appointments.filter(status='completed').count() / max(user.appointments.count(), 1)
-            analytics.goal_completion_rate = user.goals.filter(completed=True).count() / max(user.goals.count(), 1)
-
-            analytics.save()
-            return analytics
+                else:
+                    appointment_counts = user.appointments.aggregate(
+                        total=Count('id'),
+                        completed=Count('id', filter=Q(status='completed')),
+                    )
+                goal_counts = user.goals.aggregate(
+                    total=Count('id'),
+                    completed=Count('id', filter=Q(completed=True)),
+                )
+
+                _apply_user_scores(
+                    analytics, moods, chat_counts, appointment_counts,
+                    user.achievements.count(), goal_counts, now,
+                )
+
+                # Only write the recomputed columns; the rest of the row is unchanged
+                analytics.save(update_fields=USER_SCORE_FIELDS + ['updated_at'])
+                return analytics
 
         except Exception as e:
             logger.error(f"Error updating user analytics: {str(e)}")
             return None
 
+    @staticmethod
+    def bulk_refresh_user_analytics(user_ids):
+        """Recompute UserAnalytics for many users with grouped queries and one batched upsert.
+
+        Scores match update_user_analytics; rows are written without row locks,
+        so this is meant for the nightly batch rather than signal-driven updates.
+        """
+        user_ids = list(user_ids)
+        now = timezone.now()
+        thirty_days_ago = now - timedelta(days=30)
+
+        moods = defaultdict(list)
+        for user_id, mood in MoodEntry.objects.filter(
+            user_id__in=user_ids, date__gte=thirty_days_ago.date()
+        ).values_list('user_id', 'mood'):
+            moods[user_id].append(mood)
+
+        # Conversations and goals are tallied in separate queries so their joins don't multiply
+        users = User.objects.filter(id__in=user_ids).annotate(
+            chat_total=Count('ai_conversations'), chat_messages=Sum('ai_conversations__message_count'),
+        ).values('id', 'username', 'chat_total', 'chat_messages')
+        goal_counts = {
+            row['id']: row for row in User.objects.filter(id__in=user_ids).annotate(
+                total=Count('goals'), completed=Count('goals', filter=Q(goals__completed=True)),
+            ).values('id', 'total', 'completed')
+        }
+        appointment_counts = {
+            row['user_id']: row for row in Appointment.objects.filter(user_id__in=user_ids).values('user_id').annotate(
+                total=Count('id'), completed=Count('id', filter=Q(status='completed')),
+            ).order_by()
+        }
+        achievement_counts = dict(
+            Achievement.objects.filter(user_id__in=user_ids).values('user_id').annotate(
+                n=Count('id'),
+            ).order_by().values_list('user_id', 'n')
+        )
+        existing = UserAnalytics.objects.filter(user_id__in=user_ids).in_bulk(field_name='user_id')
+
+        rows = []
+        no_counts = {'total': 0, 'completed': 0}
+        for user in users:
+            analytics = existing.get(user['id']) or UserAnalytics(user_id=user['id'], username_cache=user['username'])
+            _apply_user_scores(
+                analytics,
+                moods.get(user['id'], []),
+                {'total': user['chat_total'], 'messages': user['chat_messages']},
+                appointment_counts.get(user['id'], no_counts),
+                achievement_counts.get(user['id'], 0),
+                goal_counts.get(user['id'], no_counts),
+                now,
+            )
+            # Existing rows are matched on user, not id, by the upsert below
+            analytics.pk = None
+            rows.append(analytics)
+
+        UserAnalytics.objects.bulk_create(
+            rows,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=USER_SCORE_FIELDS + ['updated_at'],
+        )
+        return len(rows)
+
     @staticmethod
     def analyze_mood_patterns(user):
         """Analyze mood patterns and create insights"""
         try:
             mood_entries = user.mood_entries.all().order_by('date')
-            if not mood_entries:
+            if not mood_entries.exists():
                 return None
 
             # Use ML model for prediction
@@ -90,44 +270,23 @@ class AnalyticsService:
             # predictor.train(user)
 
             insights = []
-            for entry in mood_entries:
-                # predicted_mood = predictor.predict_mood(user, entry.date)
-                predicted_mood = None  # Temporarily disabled ML prediction
-
-                mood_mapping = {
-                    'happy': 5, 'excited': 4, 'calm': 3,
-                    'sad': 1, 'anxious': 2, 'angry': 1
-                }
-                actual_score = mood_mapping.get(entry.mood, 3)
-                predicted_score = mood_mapping.get(predicted_mood, 3) if predicted_mood else 3
-
-                # Determine trend
-                if abs(actual_score - predicted_score) < 0.5:
-                    trend = 'stable'
-                elif actual_score > predicted_score:
-                    trend = 'improving'
-                else:
-                    trend = 'declining'
-
-                # Create or update mood analytics
-                analytics, created = MoodAnalytics.objects.get_or_create(
-                    user=user,
-                    date=entry.date,
-                    defaults={
-                        'mood_score': actual_score,
-                        'mood_trend': trend,
-                        'predicted_mood': predicted_score,
-                        'mood_confidence': 0.8 if predicted_mood else 0.0,
-                        'insights': f"Mood was {'better' if trend == 'improving' else 'worse' if trend == 'declining' else 'as expected'} than predicted"
-                    }
-                )
-
-                if not created:
-                    analytics.mood_score = actual_score
-                    analytics.mood_trend = trend
-                    analytics.predicted_mood = predicted_score
-                    analytics.mood_confidence = 0.8 if predicted_mood else 0.0
-                    analytics.save()
+            rows = []
+            # With prediction disabled the fields depend only on the mood, so each
+            # distinct mood is evaluated once
+            fields_by_mood = {}
+            for entry_date, mood in mood_entries.values_list('date', 'mood'):
+                # Temporarily disabled ML prediction; once re-enabled, use
+                # _mood_analytics_fields(mood, predictor.predict_mood(user, entry_date))
+                fields = fields_by_mood.get(mood)
+                if fields is None:
+                    fields = fields_by_mood[mood] = _mood_analytics_fields(mood)
+                rows.append(MoodAnalytics(user=user, analysis_date=entry_date, **fields))
+
+            # One batched upsert; existing days keep their original insights text
+            MoodAnalytics.bulk_upsert(
+                rows,
+                update_fields=['mood_score', 'mood_trend', 'predicted_mood', 'mood_confidence'],
+            )
 
             return insights
 
@@ -142,7 +301,9 @@ class AnalyticsService:
             from chat.models import AIMessage
             messages = AIMessage.objects.filter(conversation__user=user, conversation=session)
 
-            if not messages:
+            # Count in SQL instead of loading every message just to test and size the queryset
+            message_count = messages.count()
+            if not message_count:
                 return None
 
             # sentiment_analyzer = SentimentAnalysisModel()
@@ -154,7 +315,7 @@ class AnalyticsService:
                 user=user,
                 session=session,
                 defaults={
-                    'message_count': len(messages),
+                    'message_count': message_count,
                     'sentiment_score': analysis.get('average_sentiment', 0),
                     'sentiment_trend': analysis.get('dominant_sentiment', 'neutral'),
                     'keywords': analysis.get('keywords', []),
@@ -227,73 +388,88 @@ class AnalyticsService:
     def generate_user_report(user, report_type='weekly'):
         """Generate comprehensive analytics report for user"""
         try:
-            now = timezone.now()
-
-            if report_type == 'weekly':
-                period_start = now - timedelta(days=7)
-                title = f"Weekly Report - {user.username}"
-            elif report_type == 'monthly':
-                period_start = now - timedelta(days=30)
-                title = f"Monthly Report - {user.username}"
-            else:
-                period_start = now - timedelta(days=7)
-                title = f"Custom Report - {user.username}"
-
-            # Gather data
-            mood_entries = user.mood_entries.filter(date__gte=period_start.date())
-            chat_sessions = user.ai_conversations.filter(created_at__gte=period_start)
-            appointments = user.appointments.filter(scheduled_date__gte=period_start)
-            achievements = user.achievements.filter(unlocked_at__gte=period_start)
-
-            # Calculate metrics
-            summary_data = {
-                'mood_entries_count': mood_entries.count(),
-                'chat_sessions_count': chat_sessions.count(),
-                'appointments_count': appointments.count(),
-                'achievements_count': achievements.count(),
-                'avg_mood_score': mood_entries.aggregate(avg_score=Avg('mood_score'))['avg_score'] or 0,
-                'total_messages': sum(session.message_count for session in chat_sessions),
-            }
-
-            # Generate insights
-            insights = []
-            if summary_data['mood_entries_count'] > 0:
-                insights.append(f"Logged mood {summary_data['mood_entries_count']} times this period")
-            if summary_data['chat_sessions_count'] > 0:
-                insights.append(f"Engaged in {summary_data['chat_sessions_count']} chat sessions")
-            if summary_data['appointments_count'] > 0:
-                insights.append(f"Had {summary_data['appointments_count']} appointments scheduled")
-
-            # Generate recommendations
-            recommendations = []
-            if summary_data['mood_entries_count'] < 3:
-                recommendations.append("Consider logging your mood more regularly for better insights")
-            if summary_data['chat_sessions_count'] == 0:
-                recommendations.append("Try engaging with the AI companion for additional support")
-
-            # Create report
-            report = AnalyticsReport.objects.create(
-                title=title,
-                report_type=report_type,
-                generated_for=user,
-                period_start=period_start,
-                period_end=now,
-                summary_data=summary_data,
-                insights=insights,
-                recommendations=recommendations,
-                charts_data={},  # Would contain chart data for visualizations
-            )
-
+            report = AnalyticsService.build_user_report(user, report_type)
+            report.save()
             return report
 
         except Exception as e:
             logger.error(f"Error generating user report: {str(e)}")
             return None
 
+    @staticmethod
+    def build_user_report(user, report_type='weekly'):
+        """Compute an analytics report for user without saving it, for batch inserts"""
+        now = timezone.now()
+
+        if report_type == 'weekly':
+            period_start = now - timedelta(days=7)
+            title = f"Weekly Report - {user.username}"
+        elif report_type == 'monthly':
+            period_start = now - timedelta(days=30)
+            title = f"Monthly Report - {user.username}"
+        else:
+            period_start = now - timedelta(days=7)
+            title = f"Custom Report - {user.username}"
+
+        # Gather data
+        mood_entries = user.mood_entries.filter(date__gte=period_start.date())
+        chat_sessions = user.ai_conversations.filter(created_at__gte=period_start)
+        appointments = user.appointments.filter(scheduled_date__gte=period_start)
+        achievements = user.achievements.filter(unlocked_at__gte=period_start)
+
+        # Calculate metrics, one aggregate per related table
+        mood_totals = mood_entries.aggregate(count=Count('id'), avg_score=Avg('mood_score'))
+        chat_totals = chat_sessions.aggregate(count=Count('id'), messages=Sum('message_count'))
+        summary_data = {
+            'mood_entries_count': mood_totals['count'],
+            'chat_sessions_count': chat_totals['count'],
+            'appointments_count': appointments.count(),
+            'achievements_count': achievements.count(),
+            'avg_mood_score': mood_totals['avg_score'] or 0,
+            'total_messages': chat_totals['messages'] or 0,
+        }
+
+        # Generate insights
+        insights = []
+        if summary_data['mood_entries_count'] > 0:
+            insights.append(f"Logged mood {summary_data['mood_entries_count']} times this period")
+        if summary_data['chat_sessions_count'] > 0:
+            insights.append(f"Engaged in {summary_data['chat_sessions_count']} chat sessions")
+        if summary_data['appointments_count'] > 0:
+            insights.append(f"Had {summary_data['appointments_count']} appointments scheduled")
+
+        # Generate recommendations
+        recommendations = []
+        if summary_data['mood_entries_count'] < 3:
+            recommendations.append("Consider logging your mood more regularly for better insights")
+        if summary_data['chat_sessions_count'] == 0:
+            recommendations.append("Try engaging with the AI companion for additional support")
+
+        return AnalyticsReport(
+            title=title,
+            report_type=report_type,
+            generated_for=user,
+            period_start=period_start,
+            period_end=now,
+            summary_data=summary_data,
+            insights=insights,
+            recommendations=recommendations,
+            charts_data={},  # Would contain chart data for visualizations
+        )
+
     @staticmethod
     def get_personalized_insights(user):
         """Generate personalized insights and recommendations"""
         try:
+            # Key on the last analytics recompute so bursts of signals reuse one result
+            updated_at = UserAnalytics.objects.filter(user=user).values_list('updated_at', flat=True).first()
+            cache_key = None
+            if updated_at:
+                cache_key = f"personalized_insights:{user.id}:{int(updated_at.timestamp())}"
+                cached_insights = cache.get(cache_key)
+                if cached_insights is not None:
+                    return cached_insights
+
             # Analyze behavior patterns
             # behavior_analyzer = BehaviorAnalyticsModel()
             # behavior_analysis = behavior_analyzer.analyze_user_behavior(user)
@@ -338,21 +514,22 @@ class AnalyticsService:
                     'actions': ['Consider professional counseling', 'Reach out to support network', 'Use crisis resources if needed']
                 })
 
-            # Create predictive insights records
-            for insight in insights:
-                PredictiveInsights.objects.get_or_create(
+            # Create predictive insights records; ones that already exist are left untouched
+            PredictiveInsights.objects.bulk_create([
+                PredictiveInsights(
                     user=user,
                     insight_type=insight['type'],
                     title=insight['title'],
-                    defaults={
-                        'description': insight['description'],
-                        'confidence_score': 0.7,
-                        'severity_level': insight['severity'],
-                        'recommended_actions': insight['actions'],
-                        'data_sources': ['behavior_analysis', 'mood_patterns', 'chat_sentiment']
-                    }
-                )
-
+                    description=insight['description'],
+                    confidence_score=0.7,
+                    severity_level=insight['severity'],
+                    recommended_actions=insight['actions'],
+                    data_sources=['behavior_analysis', 'mood_patterns', 'chat_sentiment']
+                ) for insight in insights
+            ], ignore_conflicts=True)
+
+            if cache_key:
+                cache.set(cache_key, insights, PERSONALIZED_INSIGHTS_CACHE_TIMEOUT)
             return insights
 
         except Exception as e:
@@ -363,52 +540,88 @@ class AnalyticsService:
 class CounselorAnalyticsService:
     """Service for counselor-specific analytics and dashboards"""
 
+    @staticmethod
+    def get_counselors_with_stats(counselors):
+        """Annotate a counselor queryset with appointment and session statistics, computed in one query
+
+        Each statistic is a correlated subquery: joining appointments and video
+        calls in the same annotate would multiply the rows and inflate the counts.
+        """
+        def per_counselor(queryset, field, aggregate):
+            return Subquery(
+                queryset.filter(**{field: OuterRef('pk')})
+                .order_by().values(field).annotate(value=aggregate).values('value')[:1]
+            )
+
+        appointments = Appointment.objects.all()
+        completed = appointments.filter(status='completed')
+        return counselors.annotate(
+            appointment_count=Coalesce(per_counselor(appointments, 'counselor', Count('*')), 0),
+            completed_count=Coalesce(per_counselor(completed, 'counselor', Count('*')), 0),
+            upcoming_count=Coalesce(per_counselor(
+                appointments.filter(status__in=['scheduled', 'confirmed'], scheduled_date__gte=timezone.now()),
+                'counselor', Count('*'),
+            ), 0),
+            client_count=Coalesce(per_counselor(appointments, 'counselor', Count('user', distinct=True)), 0),
+            avg_session_duration=per_counselor(completed, 'counselor', Avg('duration_minutes')),
+            video_session_count=Coalesce(per_counselor(
+                VideoCall.objects.filter(status='completed'), 'host', Count('*'),
+            ), 0),
+        )
+
     @staticmethod
     def get_counselor_dashboard_data(counselor):
         """Get comprehensive dashboard data for counselors"""
         try:
+            now = timezone.now()
+
             # Get counselor's clients
             clients = User.objects.filter(
                 Q(appointments__counselor=counselor) |
                 Q(client_appointments__counselor=counselor)
-            ).distinct()
+            )
+
+            # Total and active clients tallied in one query; the joins above repeat
+            # clients, so both counts are distinct
+            client_counts = clients.annotate(
+                has_upcoming=Exists(Appointment.objects.filter(
+                    user=OuterRef('pk'),
+                    status__in=['scheduled', 'confirmed'],
+                    scheduled_date__gte=now,
+                ))
+            ).aggregate(
+                total=Count('id', distinct=True),
+                active=Count('id', distinct=True, filter=Q(has_upcoming=True)),
+            )
+            total_clients = client_counts['total']
+            session_counts = counselor.appointments.aggregate(
+                upcoming=Count('id', filter=Q(scheduled_date__gte=now, status__in=['scheduled', 'confirmed'])),
+                completed=Count('id', filter=Q(status='completed')),
+            )
 
             dashboard_data = {
-                'total_clients': clients.count(),
-                'active_clients': clients.filter(
-                    appointments__status__in=['scheduled', 'confirmed'],
-                    appointments__scheduled_date__gte=timezone.now()
-                ).distinct().count(),
-                'upcoming_appointments': counselor.appointments.filter(
-                    scheduled_date__gte=timezone.now(),
-                    status__in=['scheduled', 'confirmed']
-                ).count(),
-                'completed_sessions': counselor.appointments.filter(
-                    status='completed'
-                ).count(),
+                'total_clients': total_clients,
+                'active_clients': client_counts['active'],
+                'upcoming_appointments': session_counts['upcoming'],
+                'completed_sessions': session_counts['completed'],
                 'client_risk_summary': {},
                 'recent_activity': []
             }
 
-            # Client risk summary
-            high_risk_clients = 0
-            medium_risk_clients = 0
-
-            for client in clients:
-                analytics = UserAnalytics.objects.filter(user=client).first()
-                if analytics and analytics.risk_score >= 70:
-                    high_risk_clients += 1
-                elif analytics and analytics.risk_score >= 40:
-                    medium_risk_clients += 1
+            # Client risk summary, bucketed in a single query
+            risk_counts = UserAnalytics.objects.filter(user__in=clients).aggregate(
+                high=Count('id', filter=Q(risk_score__gte=70)),
+                medium=Count('id', filter=Q(risk_score__gte=40, risk_score__lt=70)),
+            )
 
             dashboard_data['client_risk_summary'] = {
-                'high_risk': high_risk_clients,
-                'medium_risk': medium_risk_clients,
-                'low_risk': clients.count() - high_risk_clients - medium_risk_clients
+                'high_risk': risk_counts['high'],
+                'medium_risk': risk_counts['medium'],
+                'low_risk': total_clients - risk_counts['high'] - risk_counts['medium']
             }
 
             # Recent activity (last 7 days)
-            recent_appointments = counselor.appointments.filter(
+            recent_appointments = counselor.appointments.select_related('user').filter(
                 scheduled_date__gte=timezone.now() - timedelta(days=7)
             ).order_by('-scheduled_date')[:5]
 
@@ -435,18 +648,27 @@ class CounselorAnalyticsService:
 
             # Gather counselor metrics
             appointments = counselor.appointments.filter(scheduled_date__gte=start_date)
-            completed_sessions = appointments.filter(status='completed')
             client_feedback = counselor.received_feedback.filter(created_at__gte=start_date)
 
+            # One aggregate per table instead of a query per figure
+            completed = Q(status='completed')
+            appointment_totals = appointments.aggregate(
+                total=Count('id'),
+                completed=Count('id', filter=completed),
+                unique_clients=Count('user', distinct=True),
+                avg_duration=Avg('duration_minutes', filter=completed),
+            )
+            feedback_totals = client_feedback.aggregate(avg_rating=Avg('rating'), count=Count('id'))
+
             report_data = {
                 'period_days': period_days,
-                'total_appointments': appointments.count(),
-                'completed_sessions': completed_sessions.count(),
-                'completion_rate': completed_sessions.count() / max(appointments.count(), 1),
-                'unique_clients': appointments.values('user').distinct().count(),
-                'avg_session_duration': completed_sessions.aggregate(avg_duration=Avg('duration_minutes'))['avg_duration'] or 0,
-                'client_satisfaction': client_feedback.aggregate(avg_rating=Avg('rating'))['avg_rating'] or 0,
-                'feedback_count': client_feedback.count(),
+                'total_appointments': appointment_totals['total'],
+                'completed_sessions': appointment_totals['completed'],
+                'completion_rate': appointment_totals['completed'] / max(appointment_totals['total'], 1),
+                'unique_clients': appointment_totals['unique_clients'],
+                'avg_session_duration': appointment_totals['avg_duration'] or 0,
+                'client_satisfaction': feedback_totals['avg_rating'] or 0,
+                'feedback_count': feedback_totals['count'],
             }
 
             # Create analytics report
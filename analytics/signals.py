@@ -1,26 +1,30 @@
 from django.db.models.signals import post_save, post_delete
+from django.db import transaction
 from django.dispatch import receiver
+from django.core.cache import cache
 from django.utils import timezone
 from datetime import timedelta
 from accounts.models import MoodEntry, User
 from chat.models import AIMessage, AIConversation
+from .caching import DASHBOARD_OVERVIEW_CACHE_KEY
 from .services import AnalyticsService
+from .tasks import analyze_conversation_sentiment, debounce, recompute_user_analytics
 from .ml_models import SentimentAnalysisModel
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Weekly reports are inserted this many rows per INSERT
+REPORT_BATCH_SIZE = 500
+
 
 @receiver(post_save, sender=MoodEntry)
 def update_mood_analytics(sender, instance, created, **kwargs):
     """Update mood analytics when mood entries are saved"""
     try:
         if created:
-            # Analyze mood patterns for the user
-            AnalyticsService.analyze_mood_patterns(instance.user)
-
-            # Update user analytics
-            AnalyticsService.update_user_analytics(instance.user)
+            # Mood patterns and user analytics are recomputed once per burst of entries
+            debounce(recompute_user_analytics, instance.user_id, True)
 
     except Exception as e:
         logger.error(f"Error updating mood analytics: {str(e)}")
@@ -31,11 +35,9 @@ def analyze_chat_sentiment(sender, instance, created, **kwargs):
     """Analyze sentiment when AI messages are saved"""
     try:
         if created:
-            # Analyze sentiment for the conversation
-            AnalyticsService.analyze_chat_sentiment(instance.conversation.user, instance.conversation)
-
-            # Update user analytics
-            AnalyticsService.update_user_analytics(instance.conversation.user)
+            # A chat session saves many messages in quick succession; analyze once it settles
+            debounce(analyze_conversation_sentiment, instance.conversation_id)
+            debounce(recompute_user_analytics, instance.conversation.user_id, False)
 
     except Exception as e:
         logger.error(f"Error analyzing chat sentiment: {str(e)}")
@@ -55,17 +57,38 @@ def create_user_analytics(sender, instance, created, **kwargs):
         logger.error(f"Error creating user analytics: {str(e)}")
 
 
+@receiver(post_save, sender=User)
+def sync_analytics_username(sender, instance, **kwargs):
+    """Keep the denormalized username on UserAnalytics in step with the user"""
+    from .models import UserAnalytics
+
+    UserAnalytics.objects.filter(user=instance).exclude(
+        username_cache=instance.username
+    ).update(username_cache=instance.username)
+
+
+@receiver(post_save, sender='analytics.UserAnalytics')
+@receiver(post_save, sender='analytics.MoodAnalytics')
+def invalidate_dashboard_overview(sender, **kwargs):
+    """Drop the cached dashboard overview once the analytics behind it change"""
+    cache.delete(DASHBOARD_OVERVIEW_CACHE_KEY)
+
+
 # Periodic analytics updates (would be handled by Celery tasks in production)
 def update_all_user_analytics():
     """Batch update analytics for all users (for periodic tasks)"""
     try:
-        users = User.objects.all()
-        for user in users:
+        # Stream users in chunks and count as we go instead of re-querying; each
+        # chunk prefetches the rows update_user_analytics reads
+        user_count = 0
+        users = AnalyticsService.prefetch_for_update(User.objects.only('id', 'username'))
+        for user in users.iterator(chunk_size=100):
             AnalyticsService.update_user_analytics(user)
             AnalyticsService.analyze_mood_patterns(user)
             AnalyticsService.get_personalized_insights(user)
+            user_count += 1
 
-        logger.info(f"Updated analytics for {users.count()} users")
+        logger.info(f"Updated analytics for {user_count} users")
 
     except Exception as e:
         logger.error(f"Error in batch analytics update: {str(e)}")
@@ -74,13 +97,28 @@ def update_all_user_analytics():
 def generate_weekly_reports():
     """Generate weekly analytics reports for all users"""
     try:
-        users = User.objects.all()
+        from .models import AnalyticsReport
+
         report_count = 0
+        pending = []
+
+        # Reports are built outside any transaction so one user's failed query
+        # can't abort the others; each batch is inserted atomically
+        for user in User.objects.only('id', 'username').iterator(chunk_size=500):
+            try:
+                pending.append(AnalyticsService.build_user_report(user, 'weekly'))
+            except Exception as e:
+                logger.error(f"Error generating weekly report for user {user.id}: {str(e)}")
+                continue
 
-        for user in users:
-            report = AnalyticsService.generate_user_report(user, 'weekly')
-            if report:
-                report_count += 1
+            if len(pending) >= REPORT_BATCH_SIZE:
+                with transaction.atomic():
+                    report_count += len(AnalyticsReport.objects.bulk_create(pending))
+                pending = []
+
+        if pending:
+            with transaction.atomic():
+                report_count += len(AnalyticsReport.objects.bulk_create(pending))
 
         logger.info(f"Generated {report_count} weekly reports")
 
@@ -91,22 +129,14 @@ def generate_weekly_reports():
 def perform_risk_assessments():
     """Perform risk assessments for high-risk users"""
     try:
-        from .models import UserAnalytics
-
-        # Get users with high risk scores
-        high_risk_users = UserAnalytics.objects.filter(
-            risk_score__gte=60
-        ).values_list('user', flat=True)
+        # Join through the analytics relation so high-risk users come back in one streamed query
+        high_risk_users = User.objects.filter(analytics__risk_score__gte=60).iterator(chunk_size=200)
 
         assessment_count = 0
-        for user_id in high_risk_users:
-            try:
-                user = User.objects.get(id=user_id)
-                assessment = AnalyticsService.assess_user_risk(user)
-                if assessment:
-                    assessment_count += 1
-            except User.DoesNotExist:
-                continue
+        for user in high_risk_users:
+            assessment = AnalyticsService.assess_user_risk(user)
+            if assessment:
+                assessment_count += 1
 
         logger.info(f"Performed risk assessments for {assessment_count} users")
 
@@ -122,7 +152,7 @@ def cleanup_old_analytics():
         # Keep only last 6 months of detailed analytics
         cutoff_date = timezone.now() - timedelta(days=180)
 
-        mood_deleted = MoodAnalytics.objects.filter(date__lt=cutoff_date).delete()[0]
+        mood_deleted = MoodAnalytics.objects.filter(analysis_date__lt=cutoff_date.date()).delete()[0]
         chat_deleted = ChatAnalytics.objects.filter(created_at__lt=cutoff_date).delete()[0]
         behavior_deleted = BehaviorMetrics.objects.filter(period_end__lt=cutoff_date).delete()[0]
 
@@ -0,0 +1,107 @@
+from celery import shared_task
+from django.core.cache import cache
+from django.db import transaction
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Signal-driven recomputes for the same target within this window run once
+DEBOUNCE_SECONDS = 30
+
+
+def _debounce_key(task, args):
+    return f"debounce:{task.name}:{':'.join(str(arg) for arg in args)}"
+
+
+def debounce(task, *args):
+    """Queue `task` after the current transaction commits, unless an identical call is already pending"""
+    def enqueue():
+        # cache.add only succeeds for the first caller (SETNX on Redis)
+        if cache.add(_debounce_key(task, args), True, DEBOUNCE_SECONDS * 2):
+            task.apply_async(args=args, countdown=DEBOUNCE_SECONDS)
+
+    transaction.on_commit(enqueue)
+
+
+@shared_task
+def refresh_mood_weekly_rollup():
+    """Refresh the mood_weekly materialized view used by weekly mood reports"""
+    from .models import MoodWeeklyRollup
+    try:
+        MoodWeeklyRollup.refresh()
+        logger.info("Refreshed mood weekly rollup")
+    except Exception as e:
+        logger.error(f"Failed to refresh mood weekly rollup: {e}")
+
+
+@shared_task
+def refresh_mood_daily_rollup(days=2):
+    """Refresh the recent rows of the daily mood rollup behind the mood trend chart"""
+    from .models import MoodDailyRollup
+    try:
+        refreshed = MoodDailyRollup.refresh(days)
+        logger.info(f"Refreshed {refreshed} days of the mood daily rollup")
+    except Exception as e:
+        logger.error(f"Failed to refresh mood daily rollup: {e}")
+
+
+@shared_task
+def bulk_refresh_user_analytics(batch_size=1000):
+    """Nightly recompute of every user's analytics, one batched upsert per chunk of users"""
+    from django.contrib.auth import get_user_model
+    from .services import AnalyticsService
+
+    user_ids = get_user_model().objects.order_by('id').values_list('id', flat=True)
+    refreshed = 0
+    try:
+        batch = []
+        for user_id in user_ids.iterator(chunk_size=batch_size):
+            batch.append(user_id)
+            if len(batch) == batch_size:
+                refreshed += AnalyticsService.bulk_refresh_user_analytics(batch)
+                batch = []
+        if batch:
+            refreshed += AnalyticsService.bulk_refresh_user_analytics(batch)
+        logger.info(f"Refreshed analytics for {refreshed} users")
+    except Exception as e:
+        logger.error(f"Failed to refresh user analytics after {refreshed} users: {e}")
+
+
+@shared_task
+def recompute_risk_scores():
+    """Nightly vectorized recompute of UserAnalytics.risk_score for all users"""
+    from .ml_models import recompute_risk_scores as recompute
+    try:
+        updated = recompute()
+        logger.info(f"Recomputed risk scores, {updated} changed")
+    except Exception as e:
+        logger.error(f"Failed to recompute risk scores: {e}")
+
+
+@shared_task
+def recompute_user_analytics(user_id, mood_patterns=False):
+    """Debounced recompute of a user's analytics after new mood entries or messages"""
+    from django.contrib.auth import get_user_model
+    from .services import AnalyticsService
+
+    # Clear the marker first so writes made while this runs queue another pass
+    cache.delete(_debounce_key(recompute_user_analytics, (user_id, mood_patterns)))
+    user = get_user_model().objects.filter(id=user_id).first()
+    if user is None:
+        return
+    if mood_patterns:
+        AnalyticsService.analyze_mood_patterns(user)
+    AnalyticsService.update_user_analytics(user)
+
+
+@shared_task
+def analyze_conversation_sentiment(conversation_id):
+    """Debounced sentiment analysis of a conversation after new messages"""
+    from chat.models import AIConversation
+    from .services import AnalyticsService
+
+    cache.delete(_debounce_key(analyze_conversation_sentiment, (conversation_id,)))
+    conversation = AIConversation.objects.select_related('user').filter(id=conversation_id).first()
+    if conversation is None:
+        return
+    AnalyticsService.analyze_chat_sentiment(conversation.user, conversation)
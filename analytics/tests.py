@@ -1,23 +1,33 @@
 import pytest
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.utils import timezone
 from datetime import timedelta
+from types import SimpleNamespace
 from unittest.mock import patch, MagicMock
 
+import numpy as np
+
+from accounts.models import MoodEntry
+
 from .models import (
     UserAnalytics, MoodAnalytics, ChatAnalytics, BehaviorMetrics,
     PredictiveInsights, RiskAssessment, AnalyticsReport
 )
 from .services import AnalyticsService
-from .ml_models import MoodPredictionModel, SentimentAnalysisModel, RiskAssessmentModel
+from .numeric import mood_stats
+from .ml_models import (
+    MoodPredictionModel, SentimentAnalysisModel, RiskAssessmentModel, _cached_prepare_features, _values_by_source,
+)
 
 User = get_user_model()
 
 
 class AnalyticsModelsTest(TestCase):
-    def setUp(self):
-        self.user = User.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
             username='testuser',
             email='test@example.com',
             password='testpass123',
@@ -54,6 +64,21 @@ class AnalyticsModelsTest(TestCase):
         self.assertEqual(mood_analytics.mood_trend, 'stable')
         self.assertEqual(mood_analytics.predicted_mood, 3.8)
 
+    def test_mood_analytics_bulk_upsert(self):
+        """Test MoodAnalytics.bulk_upsert updates the existing row for the same day"""
+        today = timezone.now().date()
+        MoodAnalytics.objects.create(user=self.user, analysis_date=today, mood_score=3.0)
+
+        MoodAnalytics.bulk_upsert([
+            MoodAnalytics(user=self.user, analysis_date=today, mood_score=6.0, mood_trend='improving'),
+            MoodAnalytics(user=self.user, analysis_date=today - timedelta(days=1), mood_score=5.0),
+        ])
+
+        self.assertEqual(MoodAnalytics.objects.filter(user=self.user).count(), 2)
+        updated = MoodAnalytics.objects.get(user=self.user, analysis_date=today)
+        self.assertEqual(updated.mood_score, 6.0)
+        self.assertEqual(updated.mood_trend, 'improving')
+
     def test_predictive_insights_creation(self):
         """Test PredictiveInsights model creation"""
         insight = PredictiveInsights.objects.create(
@@ -73,8 +98,9 @@ class AnalyticsModelsTest(TestCase):
 
 
 class AnalyticsServiceTest(TestCase):
-    def setUp(self):
-        self.user = User.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
             username='testuser',
             email='test@example.com',
             password='testpass123',
@@ -105,10 +131,39 @@ class AnalyticsServiceTest(TestCase):
         self.assertIn('mood_entries_count', report.summary_data)
         self.assertIn('chat_sessions_count', report.summary_data)
 
+    def test_bulk_refresh_user_analytics(self):
+        """Test batch recompute creates missing rows and updates existing ones"""
+        other = User.objects.create_user(username='other', password='testpass123', role='client')
+        UserAnalytics.objects.filter(user=other).delete()
+        UserAnalytics.objects.update_or_create(user=self.user, defaults={'engagement_score': 99.0})
+
+        refreshed = AnalyticsService.bulk_refresh_user_analytics([self.user.id, other.id])
+
+        self.assertEqual(refreshed, 2)
+        self.assertEqual(UserAnalytics.objects.filter(user__in=[self.user, other]).count(), 2)
+        self.assertNotEqual(UserAnalytics.objects.get(user=self.user).engagement_score, 99.0)
+
+    def test_mood_stats(self):
+        """Test mood score mean and population variance"""
+        self.assertEqual(mood_stats([]), (0.0, 0.0))
+        mean, variance = mood_stats([5, 3, 1, 3])
+        self.assertAlmostEqual(mean, 3.0)
+        self.assertAlmostEqual(variance, 2.0)
+
+    def test_mood_stats_fallbacks(self):
+        """Test the numpy path without numba and the plain Python path without numpy"""
+        for patched in ('analytics.numeric._compiled_welford', 'analytics.numeric.np'):
+            with self.subTest(patched=patched), patch(patched, None):
+                self.assertEqual(mood_stats([]), (0.0, 0.0))
+                mean, variance = mood_stats([5, 3, 1, 3])
+                self.assertAlmostEqual(mean, 3.0)
+                self.assertAlmostEqual(variance, 2.0)
+
 
 class MLModelsTest(TestCase):
-    def setUp(self):
-        self.user = User.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
             username='testuser',
             email='test@example.com',
             password='testpass123',
@@ -171,16 +226,62 @@ class MLModelsTest(TestCase):
         # Since we don't have real data, this should return None or handle gracefully
         self.assertTrue(prediction is None or isinstance(prediction, str))
 
+    def test_values_by_source_single_query(self):
+        """Columns from several tables come back grouped by name from one query"""
+        today = timezone.now().date()
+        MoodEntry.objects.create(user=self.user, mood='sad', date=today - timedelta(days=1))
+        MoodEntry.objects.create(user=self.user, mood='happy', date=today)
+        UserAnalytics.objects.update_or_create(user=self.user, defaults={'engagement_score': 0.25})
+
+        with self.assertNumQueries(1):
+            values = _values_by_source(
+                moods=(MoodEntry.objects.filter(user=self.user), 'mood'),
+                scores=(UserAnalytics.objects.filter(user=self.user), 'engagement_score'),
+            )
+
+        self.assertCountEqual(values['moods'], ['sad', 'happy'])
+        self.assertEqual([float(score) for score in values['scores']], [0.25])
+
+    @patch('analytics.ml_models.RiskAssessmentModel.prepare_features', return_value={'avg_mood_last_30_days': 3})
+    def test_risk_features_cache_follows_new_mood_entries(self, mock_prepare):
+        """Cached risk features are reused until the user logs a new mood entry"""
+        cache.clear()
+        UserAnalytics.objects.get_or_create(user=self.user)
+
+        _cached_prepare_features(self.user)
+        _cached_prepare_features(self.user)
+        self.assertEqual(mock_prepare.call_count, 1)
+
+        MoodEntry.objects.create(user=self.user, mood='sad', date=timezone.now().date())
+        _cached_prepare_features(self.user)
+        self.assertEqual(mock_prepare.call_count, 2)
+
+    @patch('analytics.ml_models.os.path.exists', return_value=True)
+    @patch('analytics.ml_models.joblib.load')
+    def test_mood_prediction_loads_legacy_model(self, mock_load, mock_exists):
+        """Bare estimators saved before feature_order was stored still load"""
+        mock_load.return_value = SimpleNamespace(feature_names_in_=np.array(['day_of_week', 'month']))
+        predictor = MoodPredictionModel()
+        self.assertTrue(predictor.load())
+        self.assertEqual(predictor.feature_order, ['day_of_week', 'month'])
+
+        # Without column names the model can't be used; prediction falls back to None
+        mock_load.return_value = SimpleNamespace()
+        predictor = MoodPredictionModel()
+        self.assertIsNone(predictor.predict_mood(self.user, timezone.now().date()))
+        self.assertFalse(predictor.is_trained)
+
 
 class AnalyticsViewsTest(TestCase):
-    def setUp(self):
-        self.user = User.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
             username='testuser',
             email='test@example.com',
             password='testpass123',
             role='client'
         )
-        self.counselor = User.objects.create_user(
+        cls.counselor = User.objects.create_user(
             username='counselor',
             email='counselor@example.com',
             password='testpass123',
@@ -1,26 +1,155 @@
+import csv
 import json
 from datetime import datetime, timedelta
 from django.shortcuts import render
+from functools import wraps
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
-from django.db.models import Count, Avg, Sum, Q
-from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.db.models import (
+    Count, Avg, Sum, F, Q, DurationField, ExpressionWrapper, FloatField, IntegerField, OuterRef, Subquery, Value,
+)
+from django.db.models.functions import Cast, Coalesce
+from django.db.models.functions import ExtractWeekDay, TruncDate, TruncMonth, TruncWeek
 from django.utils import timezone
 from django.core.cache import cache
+from django.db import connection
 from accounts.models import User, MoodEntry, Achievement, Appointment, VideoCall
 # from chat.models import Message, Session  # Commented out as chat app doesn't exist
-from .models import UserAnalytics, MoodAnalytics
+from messaging.models import Conversation
+from .models import UserAnalytics, MoodAnalytics, MoodDailyRollup
+from .caching import (
+    DASHBOARD_OVERVIEW_CACHE_KEY, MOOD_BY_WEEKDAY_CACHE_KEY, REALTIME_METRICS_CACHE_KEY, USER_OVERVIEW_CACHE_KEY,
+    cached_result,
+)
 from .services import AnalyticsService, CounselorAnalyticsService
 
+try:
+    import orjson
+except ImportError:  # orjson is optional; chart payloads fall back to the json module
+    orjson = None
+
+# Roles allowed to see the analytics pages and endpoints
+ANALYTICS_ROLES = frozenset({'admin', 'counselor'})
+
+# User columns the counselor table displays; notification preferences and
+# credentials stay out of the SELECT
+COUNSELOR_LIST_FIELDS = ('id', 'username', 'first_name', 'last_name', 'email')
+
+
+def analytics_access_required(view=None, as_json=False):
+    """Require a logged-in admin or counselor; others get a 403 (a JSON error body when `as_json`)"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.user.role in ANALYTICS_ROLES:
+                return view(request, *args, **kwargs)
+            if as_json:
+                return JsonResponse({'error': 'Access denied'}, status=403)
+            return HttpResponseForbidden('Access denied')
+        return login_required(wrapper)
+
+    if view is not None:
+        return decorator(view)
+    return decorator
+
+
+@cached_result(DASHBOARD_OVERVIEW_CACHE_KEY, 600)
+def dashboard_overview():
+    """Site-wide dashboard overview, cached for 10 minutes and invalidated by analytics writes"""
+    return AnalyticsService.get_dashboard_overview()
+
+
+@cached_result(USER_OVERVIEW_CACHE_KEY, 300)
+def user_overview_stats():
+    """User and mood entry totals for the user analytics page, taken in one round trip"""
+    cutoff = timezone.now() - timedelta(days=30)
+    users = User._meta.db_table
+    moods = MoodEntry._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT "
+            f"(SELECT COUNT(*) FROM {users}), "
+            f"(SELECT COUNT(*) FROM {users} WHERE last_login >= %s), "
+            f"(SELECT COUNT(*) FROM {users} WHERE date_joined >= %s), "
+            f"(SELECT COUNT(*) FROM {moods}), "
+            f"(SELECT AVG(CAST(mood AS DOUBLE PRECISION)) FROM {moods}), "
+            f"(SELECT COUNT(*) FROM {moods} WHERE date >= %s)",
+            [
+                connection.ops.adapt_datetimefield_value(cutoff),
+                connection.ops.adapt_datetimefield_value(cutoff),
+                connection.ops.adapt_datefield_value(cutoff.date()),
+            ],
+        )
+        total_users, active_users, new_users, total_entries, avg_mood, entries_last_30 = cursor.fetchone()
+
+    user_stats = {'total_users': total_users, 'active_users': active_users, 'new_users': new_users}
+    mood_stats = {'total_entries': total_entries, 'avg_mood': avg_mood, 'entries_last_30': entries_last_30}
+    return user_stats, mood_stats
+
+
+@cached_result(REALTIME_METRICS_CACHE_KEY, 300, local_timeout=10)
+def realtime_metrics():
+    """Live activity counters, each a COUNT over its own table, taken in one round trip"""
+    now = timezone.now()
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    counted = {
+        'active_users': User.objects.filter(
+            last_login__gte=now - timedelta(hours=1)
+        ),
+        'mood_entries_today': MoodEntry.objects.filter(
+            date=today_start.date()
+        ),
+        'active_chat_rooms': Conversation.objects.filter(
+            is_active=True,
+            last_message_at__gte=now - timedelta(minutes=30)
+        ),
+        'upcoming_appointments': Appointment.objects.filter(
+            scheduled_date__gte=now,
+            scheduled_date__lte=now + timedelta(hours=24),
+            status__in=['scheduled', 'confirmed']
+        ),
+        'active_video_calls': VideoCall.objects.filter(
+            status='active'
+        ),
+    }
+
+    subqueries, params = [], []
+    for queryset in counted.values():
+        sql, query_params = queryset.order_by().values('pk').query.sql_with_params()
+        subqueries.append(f'(SELECT COUNT(*) FROM ({sql}) counted)')
+        params.extend(query_params)
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT {', '.join(subqueries)}", params)
+        return dict(zip(counted, cursor.fetchone()))
+
+
+@cached_result(MOOD_BY_WEEKDAY_CACHE_KEY, 3600)
+def mood_by_weekday():
+    """Average mood and entry count per day of week (0 = Sunday ... 6 = Saturday), cached for an hour"""
+    # Groups on the same expression as the moodentry_weekday_mood_idx index
+    rows = MoodEntry.objects.annotate(
+        weekday=ExtractWeekDay('date')
+    ).values('weekday').annotate(
+        avg_mood=Avg(Cast('mood', FloatField())),
+        count=Count('id')
+    ).order_by('weekday')
+    # ExtractWeekDay counts from 1; the page has always numbered days like EXTRACT(DOW)
+    return [{'day': row['weekday'] - 1, 'avg_mood': row['avg_mood'], 'count': row['count']} for row in rows]
+
 
-@login_required
+def _per_user_count(model):
+    """Correlated COUNT(*) of `model` rows for the outer user, 0 when there are none"""
+    counts = model.objects.filter(user=OuterRef('pk')).order_by().values('user').annotate(n=Count('id')).values('n')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+@analytics_access_required
 def analytics_dashboard(request):
     """Main analytics dashboard view"""
-    if request.user.role not in ['admin', 'counselor']:
-        return render(request, 'analytics/access_denied.html')
-
     # Get dashboard data
-    dashboard_data = AnalyticsService.get_dashboard_overview()
+    dashboard_data = dashboard_overview()
 
     context = {
         'dashboard_data': dashboard_data,
@@ -29,31 +158,18 @@ def analytics_dashboard(request):
     return render(request, 'analytics/dashboard.html', context)
 
 
-@login_required
+@analytics_access_required
 def user_analytics(request):
     """User analytics view"""
-    if request.user.role not in ['admin', 'counselor']:
-        return render(request, 'analytics/access_denied.html')
-
-    # User engagement metrics
-    user_stats = User.objects.aggregate(
-        total_users=Count('id'),
-        active_users=Count('id', filter=Q(last_login__gte=timezone.now() - timedelta(days=30))),
-        new_users=Count('id', filter=Q(date_joined__gte=timezone.now() - timedelta(days=30))),
-    )
+    # User engagement and mood tracking metrics
+    user_stats, mood_stats = user_overview_stats()
 
-    # Mood tracking analytics
-    mood_stats = MoodEntry.objects.aggregate(
-        total_entries=Count('id'),
-        avg_mood=Avg('mood'),
-        entries_last_30=Count('id', filter=Q(date__gte=timezone.now() - timedelta(days=30))),
-    )
-
-    # User activity over time
+    # User activity over time; one subquery per relation instead of joining all
+    # three, which multiplied the rows (and the counts) per user
     user_activity = User.objects.annotate(
-        mood_count=Count('mood_entries'),
-        achievement_count=Count('achievements'),
-        appointment_count=Count('appointments'),
+        mood_count=_per_user_count(MoodEntry),
+        achievement_count=_per_user_count(Achievement),
+        appointment_count=_per_user_count(Appointment),
     ).values(
         'username', 'mood_count', 'achievement_count', 'appointment_count'
     ).order_by('-mood_count')[:20]
@@ -66,12 +182,9 @@ def user_analytics(request):
     return render(request, 'analytics/user_analytics.html', context)
 
 
-@login_required
+@analytics_access_required
 def mood_analytics(request):
     """Mood analytics view"""
-    if request.user.role not in ['admin', 'counselor']:
-        return render(request, 'analytics/access_denied.html')
-
     # Mood distribution
     mood_distribution = MoodEntry.objects.values('mood').annotate(
         count=Count('id')
@@ -87,42 +200,21 @@ def mood_analytics(request):
         count=Count('id')
     ).order_by('date_trunc')
 
-    # Mood by day of week
-    mood_by_day = MoodEntry.objects.annotate(
-        day_of_week=TruncDate('date')
-    ).extra(
-        select={'day': 'EXTRACT(DOW FROM date)'}
-    ).values('day').annotate(
-        avg_mood=Avg('mood'),
-        count=Count('id')
-    ).order_by('day')
-
     context = {
         'mood_distribution': mood_distribution,
         'mood_trends': mood_trends,
-        'mood_by_day': mood_by_day,
+        'mood_by_day': mood_by_weekday(),
     }
     return render(request, 'analytics/mood_analytics.html', context)
 
 
-@login_required
+@analytics_access_required
 def counselor_analytics(request):
     """Counselor performance analytics"""
-    if request.user.role not in ['admin', 'counselor']:
-        return render(request, 'analytics/access_denied.html')
-
-    counselor_service = CounselorAnalyticsService()
-
-    # Get all counselors
-    counselors = User.objects.filter(role='counselor', is_active=True)
-
-    counselor_stats = []
-    for counselor in counselors:
-        stats = counselor_service.get_counselor_stats(counselor)
-        counselor_stats.append({
-            'counselor': counselor,
-            'stats': stats,
-        })
+    # All active counselors, each annotated with its appointment statistics
+    counselor_stats = CounselorAnalyticsService.get_counselors_with_stats(
+        User.objects.filter(role='counselor', is_active=True).only(*COUNSELOR_LIST_FIELDS)
+    )
 
     context = {
         'counselor_stats': counselor_stats,
@@ -130,12 +222,9 @@ def counselor_analytics(request):
     return render(request, 'analytics/counselor_analytics.html', context)
 
 
-@login_required
+@analytics_access_required
 def chat_analytics(request):
     """Chat and messaging analytics"""
-    if request.user.role not in ['admin', 'counselor']:
-        return render(request, 'analytics/access_denied.html')
-
     # Chat session statistics
     chat_stats = Session.objects.aggregate(
         total_sessions=Count('id'),
@@ -164,12 +253,9 @@ def chat_analytics(request):
     return render(request, 'analytics/chat_analytics.html', context)
 
 
-@login_required
+@analytics_access_required
 def appointment_analytics(request):
     """Appointment and session analytics"""
-    if request.user.role not in ['admin', 'counselor']:
-        return render(request, 'analytics/access_denied.html')
-
     # Appointment statistics
     appointment_stats = Appointment.objects.aggregate(
         total_appointments=Count('id'),
@@ -205,18 +291,19 @@ def appointment_analytics(request):
     return render(request, 'analytics/appointment_analytics.html', context)
 
 
-@login_required
+@analytics_access_required
 def video_call_analytics(request):
     """Video call analytics"""
-    if request.user.role not in ['admin', 'counselor']:
-        return render(request, 'analytics/access_denied.html')
-
-    # Video call statistics
+    # Video call statistics; durations are summed per call in the database,
+    # skipping calls that never started or ended
+    call_duration = ExpressionWrapper(F('actual_end') - F('actual_start'), output_field=DurationField())
+    timed = Q(actual_start__isnull=False, actual_end__isnull=False)
     video_stats = VideoCall.objects.aggregate(
         total_calls=Count('id'),
         completed_calls=Count('id', filter=Q(status='completed')),
         scheduled_calls=Count('id', filter=Q(status='scheduled')),
-        total_duration=Sum('actual_end') - Sum('actual_start'),  # This needs refinement
+        total_duration=Sum(call_duration, filter=timed),
+        avg_duration=Avg(call_duration, filter=timed & Q(status='completed')),
     )
 
     # Calls by type
@@ -229,14 +316,8 @@ def video_call_analytics(request):
         count=Count('id')
     ).order_by('-count')
 
-    # Average call duration (simplified)
-    avg_duration = VideoCall.objects.filter(
-        status='completed',
-        actual_start__isnull=False,
-        actual_end__isnull=False
-    ).aggregate(
-        avg_duration=Avg('actual_end') - Avg('actual_start')  # This needs better calculation
-    )
+    # Average call duration of completed calls
+    avg_duration = {'avg_duration': video_stats.pop('avg_duration')}
 
     context = {
         'video_stats': video_stats,
@@ -247,99 +328,102 @@ def video_call_analytics(request):
     return render(request, 'analytics/video_call_analytics.html', context)
 
 
-@login_required
+@analytics_access_required(as_json=True)
 def export_analytics(request):
     """Export analytics data"""
-    if request.user.role not in ['admin', 'counselor']:
-        return JsonResponse({'error': 'Access denied'})
-
     export_type = request.GET.get('type', 'dashboard')
     format_type = request.GET.get('format', 'json')
 
     if export_type == 'dashboard':
-        data = AnalyticsService.get_dashboard_overview()
+        data = dashboard_overview()
+        if format_type == 'json':
+            return JsonResponse(data)
+        # For CSV export, we'd implement CSV generation here
+        return JsonResponse({'error': 'CSV export not implemented yet'})
     elif export_type == 'users':
-        data = AnalyticsService.get_user_analytics()
+        rows = AnalyticsService.get_user_analytics()
     elif export_type == 'mood':
-        data = AnalyticsService.get_mood_analytics()
+        rows = AnalyticsService.get_mood_analytics()
     else:
         return JsonResponse({'error': 'Invalid export type'})
 
+    # Row exports are streamed from a server-side cursor, so memory stays at one chunk
     if format_type == 'json':
-        return JsonResponse(data)
-    else:
-        # For CSV export, we'd implement CSV generation here
-        return JsonResponse({'error': 'CSV export not implemented yet'})
+        return StreamingHttpResponse(
+            _stream_json(rows.iterator(chunk_size=2000)), content_type='application/json'
+        )
+    response = StreamingHttpResponse(
+        _stream_csv(rows.iterator(chunk_size=2000), rows.query.values_select), content_type='text/csv'
+    )
+    response['Content-Disposition'] = f'attachment; filename="{export_type}_analytics.csv"'
+    return response
+
+
+class _Echo:
+    """File-like object whose write() hands the line back, for streaming csv.writer output"""
+
+    def write(self, value):
+        return value
+
+
+def _stream_json(rows):
+    """Yield a JSON array of the given dicts one element at a time"""
+    encoder = DjangoJSONEncoder()
+    yield '['
+    for index, row in enumerate(rows):
+        yield (',' if index else '') + encoder.encode(row)
+    yield ']'
+
+
+def _stream_csv(rows, fields):
+    """Yield CSV lines for the given dicts, header first"""
+    writer = csv.DictWriter(_Echo(), fieldnames=fields)
+    yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow(row)
 
 
 # AJAX endpoints for real-time analytics
-@login_required
+@analytics_access_required(as_json=True)
 def get_realtime_metrics(request):
     """Get real-time analytics metrics"""
-    if request.user.role not in ['admin', 'counselor']:
-        return JsonResponse({'error': 'Access denied'})
+    return JsonResponse(realtime_metrics())
 
-    # Cache key for real-time data
-    cache_key = 'realtime_analytics'
-    cached_data = cache.get(cache_key)
 
-    if cached_data:
-        return JsonResponse(cached_data)
+def _dumps_json(data):
+    """Encode `data` as JSON bytes, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, cls=DjangoJSONEncoder).encode()
 
-    # Calculate real-time metrics
-    now = timezone.now()
-    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
 
-    realtime_data = {
-        'active_users': User.objects.filter(
-            last_login__gte=now - timedelta(hours=1)
-        ).count(),
-        'mood_entries_today': MoodEntry.objects.filter(
-            date=today_start.date()
-        ).count(),
-        'active_chat_rooms': ChatRoom.objects.filter(
-            is_active=True,
-            updated_at__gte=now - timedelta(minutes=30)
-        ).count(),
-        'upcoming_appointments': Appointment.objects.filter(
-            scheduled_date__gte=now,
-            scheduled_date__lte=now + timedelta(hours=24),
-            status__in=['scheduled', 'confirmed']
-        ).count(),
-        'active_video_calls': VideoCall.objects.filter(
-            status='active'
-        ).count(),
-    }
-
-    # Cache for 5 minutes
-    cache.set(cache_key, realtime_data, 300)
-
-    return JsonResponse(realtime_data)
+def _json_bytes_response(payload):
+    return HttpResponse(payload, content_type='application/json')
 
 
-@login_required
+@analytics_access_required(as_json=True)
 def get_analytics_chart_data(request):
     """Get chart data for analytics dashboard"""
-    if request.user.role not in ['admin', 'counselor']:
-        return JsonResponse({'error': 'Access denied'})
-
     chart_type = request.GET.get('type', 'mood_trends')
     days = int(request.GET.get('days', 30))
 
     start_date = timezone.now() - timedelta(days=days)
 
+    # Charts are shared by every viewer and polled by the dashboard
+    cache_key = f'analytics_chart_json:{chart_type}:{days}'
+    # The serialized body is cached, so repeat polls skip encoding as well as the queries
+    payload = cache.get(cache_key)
+    if payload:
+        return _json_bytes_response(payload)
+
     if chart_type == 'mood_trends':
-        data = MoodEntry.objects.filter(
-            date__gte=start_date
-        ).annotate(
-            date_str=TruncDate('date')
-        ).values('date_str').annotate(
-            avg_mood=Avg('mood'),
-            count=Count('id')
-        ).order_by('date_str')
+        # Served from the daily rollup (refreshed hourly) instead of grouping raw entries
+        data = MoodDailyRollup.objects.filter(
+            date__gte=start_date.date()
+        ).values('date', 'avg_mood', count=F('entry_count'))
 
         chart_data = {
-            'labels': [item['date_str'].strftime('%Y-%m-%d') for item in data],
+            'labels': [item['date'].strftime('%Y-%m-%d') for item in data],
             'datasets': [{
                 'label': 'Average Mood',
                 'data': [float(item['avg_mood']) if item['avg_mood'] else 0 for item in data],
@@ -376,4 +460,6 @@ def get_analytics_chart_data(request):
     else:
         return JsonResponse({'error': 'Invalid chart type'})
 
-    return JsonResponse(chart_data)
\ No newline at end of file
+    payload = _dumps_json(chart_data)
+    cache.set(cache_key, payload, 300)
+    return _json_bytes_response(payload)
\ No newline at end of file
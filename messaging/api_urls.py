@@ -0,0 +1,57 @@
+"""JSON endpoints of the messaging app, mounted by messaging.urls.
+
+Within each list the patterns polled most often come first, since the
+resolver tries them in order; rarely used maintenance endpoints go last.
+"""
+from django.urls import include, path
+from . import views
+
+conversation_patterns = [
+    path('messages/', views.conversation_messages_api, name='conversation_messages_api'),
+    path('send/', views.send_message, name='send_message'),
+    path('search/', views.search_messages, name='search_messages'),
+    path('mute/<str:action>/', views.set_mute, name='set_mute'),
+    path('archive/', views.archive_conversation, name='archive_conversation'),
+    path('delete/', views.delete_conversation, name='delete_conversation'),
+]
+
+notification_api_patterns = [
+    # ?count_only=1 for the badge count that is polled
+    path('unread/', views.unread_notifications_api, name='unread_notifications_api'),
+    path('', views.notifications_api, name='notifications_api'),
+]
+
+# Chat API endpoints (matching chat.html expectations)
+chat_api_patterns = [
+    path('rooms/<int:room_id>/messages/', views.chat_room_messages_api, name='chat_room_messages_api'),
+    path('rooms/', views.chat_rooms_api, name='chat_rooms_api'),
+    path('rooms/with/<int:user_id>/', views.chat_rooms_with_user_api, name='chat_rooms_with_user_api'),
+]
+
+api_patterns = [
+    path('notifications/', include(notification_api_patterns)),
+    path('conversations/', views.conversations_api, name='conversations_api'),
+    path('chat/', include(chat_api_patterns)),
+    path('users/counselors/', views.counselors_api, name='counselors_api'),
+    path('users/', views.users_api, name='users_api'),
+]
+
+# HTTP fallback for clients without a ws/presence/ socket (messaging.consumers.PresenceConsumer)
+presence_patterns = [
+    path('update/', views.update_presence, name='update_presence'),
+    path('conversation/<int:conversation_id>/', views.get_conversation_presence, name='get_conversation_presence'),
+    path('user/<int:user_id>/', views.get_user_presence, name='get_user_presence'),
+]
+
+urlpatterns = [
+    path('api/', include(api_patterns)),
+    path('conversation/<int:conversation_id>/', include(conversation_patterns)),
+    path('presence/', include(presence_patterns)),
+    # One PATCH for any mix of messages, conversations and notifications
+    path('mark-read/', views.bulk_mark_read, name='bulk_mark_read'),
+    path('notifications/mark-all-read/', views.mark_all_notifications_read, name='mark_all_notifications_read'),
+    path('search-users/', views.search_users, name='search_users'),
+    path('create-conversation/', views.create_conversation, name='create_conversation'),
+    path('upload-attachment/', views.upload_attachment, name='upload_attachment'),
+    path('attachment/<int:attachment_id>/delete/', views.delete_attachment, name='delete_attachment'),
+]
@@ -0,0 +1,115 @@
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Conversation, UserPresence, format_presence
+
+
+def presence_group(conversation_id):
+    return f'presence_conversation_{conversation_id}'
+
+
+class PresenceConsumer(AsyncJsonWebsocketConsumer):
+    """Presence over one socket per browser tab, replacing the presence polling endpoints.
+
+    The database is written only when the state changes (connect, focusing a
+    conversation, disconnect); the other participants of each of the user's
+    conversations get the change pushed through the channel layer. A user
+    stays online until their last open socket closes.
+    Client messages: {"type": "focus", "conversation_id": <id or null>}, answered
+    with the conversation's participants presence.
+    """
+
+    async def connect(self):
+        self.user = self.scope.get('user')
+        if not self.user or not self.user.is_authenticated:
+            await self.close()
+            return
+
+        self.conversation_ids = await self.get_conversation_ids()
+        for conversation_id in self.conversation_ids:
+            await self.channel_layer.group_add(presence_group(conversation_id), self.channel_name)
+        await self.accept()
+        await self.broadcast(await self.open_socket())
+
+    async def disconnect(self, close_code):
+        if not hasattr(self, 'conversation_ids'):
+            return  # Closed before the socket was accepted
+        presence = await self.close_socket()
+        if presence:
+            await self.broadcast(presence)
+        for conversation_id in self.conversation_ids:
+            await self.channel_layer.group_discard(presence_group(conversation_id), self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        if content.get('type') != 'focus':
+            return
+        conversation_id = content.get('conversation_id')
+        if conversation_id is not None and conversation_id not in self.conversation_ids:
+            return  # Not a participant
+        await self.broadcast(await self.focus(conversation_id))
+        if conversation_id is not None:
+            await self.send_json({
+                'type': 'participants_presence',
+                'conversation_id': conversation_id,
+                'participants_presence': await self.get_participants_presence(conversation_id),
+            })
+
+    async def presence_update(self, event):
+        if event['user_id'] != self.user.id:
+            await self.send_json(event['presence'])
+
+    async def broadcast(self, presence):
+        event = {'type': 'presence.update', 'user_id': self.user.id, 'presence': presence}
+        for conversation_id in self.conversation_ids:
+            await self.channel_layer.group_send(presence_group(conversation_id), event)
+
+    def presence_payload(self, is_online, last_seen):
+        return {
+            'type': 'presence',
+            'user_id': self.user.id,
+            'username': self.user.username,
+            'is_online': is_online,
+            'last_seen': last_seen.isoformat(),
+            'status_display': format_presence(is_online, last_seen, last_seen),
+        }
+
+    @database_sync_to_async
+    def get_conversation_ids(self):
+        return set(Conversation.objects.filter(participants=self.user).values_list('id', flat=True))
+
+    @database_sync_to_async
+    def get_participants_presence(self, conversation_id):
+        return UserPresence.participants_presence(conversation_id, self.user)
+
+    @database_sync_to_async
+    def open_socket(self):
+        now = timezone.now()
+        UserPresence.objects.get_or_create(user=self.user)
+        UserPresence.objects.filter(user=self.user).update(
+            socket_count=F('socket_count') + 1, is_online=True, last_seen=now
+        )
+        return self.presence_payload(True, now)
+
+    @database_sync_to_async
+    def focus(self, conversation_id):
+        now = timezone.now()
+        UserPresence.objects.filter(user=self.user).update(
+            is_online=True, last_seen=now, current_conversation_id=conversation_id
+        )
+        return self.presence_payload(True, now)
+
+    @database_sync_to_async
+    def close_socket(self):
+        """Count the socket closed; returns the offline presence once it was the user's last one"""
+        now = timezone.now()
+        UserPresence.objects.filter(user=self.user).update(
+            socket_count=Greatest(F('socket_count') - 1, 0), last_seen=now
+        )
+        # A socket opened meanwhile raised the count again, so the user stays online
+        went_offline = UserPresence.objects.filter(user=self.user, socket_count=0, is_online=True).update(
+            is_online=False, current_conversation=None
+        )
+        return self.presence_payload(False, now) if went_offline else None
@@ -0,0 +1,10 @@
+"""Pages of the messaging app, mounted by messaging.urls."""
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('', views.messages_view, name='messages'),
+    path('conversation/<int:conversation_id>/', views.conversation_detail, name='conversation_detail'),
+    path('notifications/', views.notifications_page, name='notifications_page'),
+    path('start-chat/<int:user_id>/', views.start_chat_with_user, name='start_chat_with_user'),
+]
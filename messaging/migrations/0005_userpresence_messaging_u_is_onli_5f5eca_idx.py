@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-16 12:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0004_messageattachment_notification_userpresence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userpresence',
+            index=models.Index(fields=['is_online', '-last_seen'], name='messaging_u_is_onli_5f5eca_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations, models
+
+
+MESSAGE_INDEXES = [
+    models.Index(fields=['timestamp'], name='message_timestamp_idx'),
+    models.Index(fields=['conversation', 'timestamp'], name='message_conv_timestamp_idx'),
+]
+
+
+def add_message_indexes(apps, schema_editor):
+    # Built CONCURRENTLY on PostgreSQL so the messages table stays writable during deploy
+    Message = apps.get_model('messaging', 'Message')
+    for index in MESSAGE_INDEXES:
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.add_index(Message, index, concurrently=True)
+        else:
+            schema_editor.add_index(Message, index)
+
+
+def remove_message_indexes(apps, schema_editor):
+    Message = apps.get_model('messaging', 'Message')
+    for index in MESSAGE_INDEXES:
+        schema_editor.remove_index(Message, index)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('messaging', '0005_userpresence_messaging_u_is_onli_5f5eca_idx'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name='message', index=index) for index in MESSAGE_INDEXES
+            ],
+            database_operations=[
+                migrations.RunPython(add_message_indexes, remove_message_indexes),
+            ],
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 4.2.7 on 2026-10-16 12:51
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_last_message_and_unread(apps, schema_editor):
+    Conversation = apps.get_model('messaging', 'Conversation')
+    Message = apps.get_model('messaging', 'Message')
+    UnreadCounter = apps.get_model('messaging', 'UnreadCounter')
+
+    for conversation in Conversation.objects.prefetch_related('participants').iterator(chunk_size=500):
+        messages = Message.objects.filter(conversation=conversation)
+        last = messages.order_by('-timestamp').values('timestamp', 'content').first()
+        if last is None:
+            continue
+        Conversation.objects.filter(pk=conversation.pk).update(
+            last_message_at=last['timestamp'],
+            last_message_preview=last['content'][:120],
+        )
+        UnreadCounter.objects.bulk_create([
+            UnreadCounter(
+                user=user,
+                conversation=conversation,
+                count=messages.exclude(sender=user).exclude(read_by=user).count(),
+            )
+            for user in conversation.participants.all()
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('messaging', '0006_message_timestamp_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_preview',
+            field=models.CharField(blank=True, default='', max_length=120),
+        ),
+        migrations.CreateModel(
+            name='UnreadCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unread_counters', to='messaging.conversation')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unread_counters', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='unreadcounter',
+            constraint=models.UniqueConstraint(fields=('user', 'conversation'), name='unique_unread_counter'),
+        ),
+        migrations.RunPython(backfill_last_message_and_unread, migrations.RunPython.noop),
+    ]
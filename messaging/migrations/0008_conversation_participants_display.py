@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-16 12:54
+
+from django.db import migrations, models
+
+
+def backfill_participants_display(apps, schema_editor):
+    Conversation = apps.get_model('messaging', 'Conversation')
+    for conversation in Conversation.objects.prefetch_related('participants').iterator(chunk_size=500):
+        names = [
+            f'{user.first_name} {user.last_name}'.strip() or user.username
+            for user in conversation.participants.all()
+        ]
+        Conversation.objects.filter(pk=conversation.pk).update(participants_display=', '.join(names)[:255])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0007_conversation_last_message_unreadcounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='participants_display',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.RunPython(backfill_participants_display, migrations.RunPython.noop),
+    ]
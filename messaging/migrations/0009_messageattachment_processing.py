@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-16 12:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0008_conversation_participants_display'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='messageattachment',
+            name='processing',
+            field=models.BooleanField(default=False),
+        ),
+    ]
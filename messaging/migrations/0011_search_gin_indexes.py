@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+# tsvector expression indexes for messaging.search. PostgreSQL only, so they
+# live here rather than in Meta.indexes; the expressions match
+# user_search_vector() and message_search_vector().
+USER_SEARCH_INDEX = GinIndex(
+    SearchVector('username', 'first_name', 'last_name', 'email', config='simple'),
+    name='user_search_vector_gin',
+)
+MESSAGE_SEARCH_INDEX = GinIndex(
+    SearchVector('content', config='simple'),
+    name='message_search_vector_gin',
+)
+
+
+def search_indexes(apps):
+    return [
+        (apps.get_model(settings.AUTH_USER_MODEL), USER_SEARCH_INDEX),
+        (apps.get_model('messaging', 'Message'), MESSAGE_SEARCH_INDEX),
+    ]
+
+
+def add_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    # Built CONCURRENTLY so the user and message tables stay writable during deploy
+    for model, index in search_indexes(apps):
+        schema_editor.add_index(model, index, concurrently=True)
+
+
+def remove_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model, index in search_indexes(apps):
+        schema_editor.remove_index(model, index, concurrently=True)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('messaging', '0010_notification_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_indexes, remove_search_indexes),
+    ]
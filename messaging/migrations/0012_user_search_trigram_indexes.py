@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+# search_users' icontains compiles to UPPER(field::text) LIKE UPPER('%q%') on
+# PostgreSQL, so the trigram indexes are built on that same expression.
+USER_TRIGRAM_FIELDS = ('username', 'first_name', 'last_name', 'email')
+
+
+def add_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    user_table = apps.get_model(settings.AUTH_USER_MODEL)._meta.db_table
+    # Built CONCURRENTLY so the user table stays writable during deploy
+    for field in USER_TRIGRAM_FIELDS:
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS user_{field}_trgm ON {user_table} '
+            f'USING gin ((UPPER({field}::text)) gin_trgm_ops)'
+        )
+
+
+def remove_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for field in USER_TRIGRAM_FIELDS:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS user_{field}_trgm')
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('messaging', '0011_search_gin_indexes'),
+    ]
+
+    operations = [
+        # No-op on other databases
+        TrigramExtension(),
+        migrations.RunPython(add_trigram_indexes, remove_trigram_indexes),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-16 14:02
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0012_user_search_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='conversation',
+            name='last_message_preview',
+        ),
+    ]
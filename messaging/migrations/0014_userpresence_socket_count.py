@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-16 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0013_remove_conversation_last_message_preview'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userpresence',
+            name='socket_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
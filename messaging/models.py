@@ -1,4 +1,11 @@
-from django.db import models
+import mimetypes
+from collections import Counter
+
+from django.core.files.storage import FileSystemStorage
+from django.db import models, transaction
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.core.validators import FileExtensionValidator
@@ -25,6 +32,16 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # A user's notification list, newest first
+            models.Index(fields=['recipient', '-created_at'], name='notif_recipient_created_idx'),
+            # Unread badges and mark-all-read only touch the (small) unread subset
+            models.Index(
+                fields=['recipient', '-created_at'],
+                condition=models.Q(is_read=False),
+                name='notif_unread_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.notification_type}: {self.title}"
@@ -32,8 +49,17 @@ class Notification(models.Model):
     def mark_as_read(self):
         if not self.is_read:
             self.is_read = True
-            self.read_at = timezone.now
-            self.save()
+            self.read_at = timezone.now()
+            # Plain UPDATE; skips save()'s full-row write
+            Notification.objects.filter(pk=self.pk, is_read=False).update(is_read=True, read_at=self.read_at)
+
+    @classmethod
+    def mark_all_read(cls, user, conversation=None):
+        """Mark the user's unread notifications (optionally for one conversation) read in one UPDATE"""
+        unread = cls.objects.filter(recipient=user, is_read=False)
+        if conversation is not None:
+            unread = unread.filter(conversation=conversation)
+        return unread.update(is_read=True, read_at=timezone.now())
 
 
 class UserPresence(models.Model):
@@ -41,35 +67,75 @@ class UserPresence(models.Model):
     is_online = models.BooleanField(default=False)
     last_seen = models.DateTimeField(default=timezone.now)
     current_conversation = models.ForeignKey('Conversation', on_delete=models.SET_NULL, null=True, blank=True)
+    # Open presence sockets across the user's tabs; they are only offline once the last one closes
+    socket_count = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return f"{self.user.username} - {'Online' if self.is_online else 'Offline'}"
 
     def update_presence(self, is_online=True, conversation=None):
         self.is_online = is_online
-        self.last_seen = timezone.now
+        self.last_seen = timezone.now()
         if conversation:
             self.current_conversation = conversation
         self.save()
 
     @property
     def status_display(self):
-        if self.is_online:
-            return 'Online'
-        elif self.last_seen:
-            now = timezone.now()
-            diff = now - self.last_seen
-            if diff.days > 0:
-                return f'Last seen {diff.days} day{"s" if diff.days > 1 else ""} ago'
-            elif diff.seconds > 3600:
-                hours = diff.seconds // 3600
-                return f'Last seen {hours} hour{"s" if hours > 1 else ""} ago'
-            elif diff.seconds > 60:
-                minutes = diff.seconds // 60
-                return f'Last seen {minutes} minute{"s" if minutes > 1 else ""} ago'
-            else:
-                return 'Last seen just now'
-        return 'Offline'
+        return format_presence(self.is_online, self.last_seen)
+
+    @classmethod
+    def participants_presence(cls, conversation_id, user):
+        """Presence of the conversation's participants other than `user`, as sent to clients"""
+        participants = list(User.objects.filter(conversations=conversation_id).exclude(id=user.id))
+
+        # One query for every participant's presence; missing records are created in one insert
+        presences = cls.objects.filter(user__in=participants).in_bulk(field_name='user_id')
+        missing = [cls(user=participant, is_online=False) for participant in participants
+                   if participant.id not in presences]
+        if missing:
+            cls.objects.bulk_create(missing, ignore_conflicts=True)
+            presences.update({presence.user_id: presence for presence in missing})
+
+        now = timezone.now()
+        presence_data = []
+        for participant in participants:
+            presence = presences[participant.id]
+            presence_data.append({
+                'user_id': participant.id,
+                'username': participant.username,
+                'full_name': participant.get_full_name(),
+                'is_online': presence.is_online,
+                'last_seen': presence.last_seen.isoformat(),
+                'status_display': format_presence(presence.is_online, presence.last_seen, now),
+                'current_conversation': presence.current_conversation_id
+            })
+        return presence_data
+
+    class Meta:
+        indexes = [
+            # "Who is online / recently seen" lookups scan this instead of every row
+            models.Index(fields=['is_online', '-last_seen']),
+        ]
+
+
+def format_presence(is_online, last_seen, now=None):
+    """Human-readable presence, e.g. 'Online' or 'Last seen 3 hours ago'"""
+    if is_online:
+        return 'Online'
+    elif last_seen:
+        diff = (now or timezone.now()) - last_seen
+        if diff.days > 0:
+            return f'Last seen {diff.days} day{"s" if diff.days > 1 else ""} ago'
+        elif diff.seconds > 3600:
+            hours = diff.seconds // 3600
+            return f'Last seen {hours} hour{"s" if hours > 1 else ""} ago'
+        elif diff.seconds > 60:
+            minutes = diff.seconds // 60
+            return f'Last seen {minutes} minute{"s" if minutes > 1 else ""} ago'
+        else:
+            return 'Last seen just now'
+    return 'Offline'
 
 
 class Conversation(models.Model):
@@ -78,19 +144,40 @@ class Conversation(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)  # Add this field to fix the NOT NULL constraint error
+    # Denormalized from the newest message (see Message.save and the post_delete receiver) for inbox ordering
+    last_message_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    # Participant names joined for display; kept current by the m2m_changed receiver below
+    participants_display = models.CharField(max_length=255, blank=True, default='')
 
     def __str__(self):
-        if self.title:
-            return self.title
-        participants_names = [p.get_full_name() or p.username for p in self.participants.all()]
-        return ', '.join(participants_names) or 'Conversation'
+        return self.title or self.participants_display or 'Conversation'
+
+    @classmethod
+    def refresh_participants_display(cls, conversation_ids):
+        """Recompute participants_display for the given conversations, reading all their names in one query"""
+        names = {conversation_id: [] for conversation_id in conversation_ids}
+        memberships = cls.participants.through.objects.filter(
+            conversation_id__in=names
+        ).order_by('id').values_list('conversation_id', 'user__first_name', 'user__last_name', 'user__username')
+        for conversation_id, first_name, last_name, username in memberships:
+            names[conversation_id].append(f'{first_name} {last_name}'.strip() or username)
+        for conversation_id, participant_names in names.items():
+            display = ', '.join(participant_names)[:255]
+            cls.objects.filter(pk=conversation_id).exclude(participants_display=display).update(
+                participants_display=display
+            )
 
     @property
     def last_message(self):
         return self.messages.order_by('-timestamp').first()
 
     def unread_count(self, user):
-        return self.messages.exclude(sender=user).exclude(read_by=user).count()
+        counter = UnreadCounter.objects.filter(user=user, conversation=self).values_list('count', flat=True).first()
+        return counter or 0
+
+    def mark_read(self, user):
+        """Reset the user's unread counter for this conversation"""
+        UnreadCounter.objects.filter(user=user, conversation=self).update(count=0)
 
 
 class Message(models.Model):
@@ -104,8 +191,87 @@ class Message(models.Model):
     def __str__(self):
         return f'{self.sender.username}: {self.content[:50]}'
 
+    def save(self, *args, **kwargs):
+        is_new = self._state.adding
+        super().save(*args, **kwargs)
+        if is_new:
+            Conversation.objects.filter(pk=self.conversation_id).update(last_message_at=self.timestamp)
+            UnreadCounter.increment(self.conversation_id, exclude_user_id=self.sender_id)
+
+    @classmethod
+    def mark_read_by(cls, user, messages):
+        """Mark `messages` read by `user`, skipping their own and ones already read; returns the count.
+
+        One INSERT into the read_by table, then one counter UPDATE per conversation touched.
+        """
+        unread = list(
+            messages.exclude(sender=user).exclude(read_by=user).values_list('id', 'conversation_id')
+        )
+        if not unread:
+            return 0
+        ReadBy = cls.read_by.through
+        ReadBy.objects.bulk_create(
+            [ReadBy(message_id=message_id, user_id=user.pk) for message_id, _ in unread],
+            ignore_conflicts=True,
+            batch_size=1000,
+        )
+        for conversation_id, count in Counter(conversation_id for _, conversation_id in unread).items():
+            UnreadCounter.objects.filter(user=user, conversation_id=conversation_id).update(
+                count=Greatest(models.F('count') - count, 0)
+            )
+        return len(unread)
+
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            # Date-bucketed message analytics filter on timestamp alone
+            models.Index(fields=['timestamp'], name='message_timestamp_idx'),
+            # A conversation's messages in display order
+            models.Index(fields=['conversation', 'timestamp'], name='message_conv_timestamp_idx'),
+        ]
+
+
+class UnreadCounter(models.Model):
+    """Per-user unread message count for a conversation, kept current by Message.save, mark_read_by and deletes"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='unread_counters')
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='unread_counters')
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'conversation'], name='unique_unread_counter'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username}: {self.count} unread in {self.conversation_id}"
+
+    @classmethod
+    def increment(cls, conversation_id, exclude_user_id=None):
+        """Add one unread message for every participant of the conversation except `exclude_user_id`"""
+        recipient_ids = list(
+            Conversation.participants.through.objects.filter(conversation_id=conversation_id)
+            .exclude(user_id=exclude_user_id)
+            .values_list('user_id', flat=True)
+        )
+        if not recipient_ids:
+            return
+        cls.objects.bulk_create(
+            [cls(user_id=user_id, conversation_id=conversation_id) for user_id in recipient_ids],
+            ignore_conflicts=True,
+        )
+        cls.objects.filter(conversation_id=conversation_id, user_id__in=recipient_ids).update(
+            count=models.F('count') + 1
+        )
+
+    @classmethod
+    def recount(cls, conversation_id):
+        """Recompute every counter of the conversation from the messages each user hasn't read"""
+        unread = Message.objects.filter(conversation_id=conversation_id).exclude(
+            sender_id=models.OuterRef('user_id')
+        ).exclude(
+            read_by=models.OuterRef('user_id')
+        ).order_by().values('conversation_id').annotate(total=models.Count('id')).values('total')
+        cls.objects.filter(conversation_id=conversation_id).update(count=Coalesce(models.Subquery(unread), 0))
 
 
 class MessageAttachment(models.Model):
@@ -120,6 +286,8 @@ class MessageAttachment(models.Model):
     file_size = models.PositiveIntegerField()  # Size in bytes
     content_type = models.CharField(max_length=100)
     uploaded_at = models.DateTimeField(default=timezone.now)
+    # Set while file_size waits on a background read from remote storage
+    processing = models.BooleanField(default=False)
 
     def __str__(self):
         return f"Attachment: {self.filename}"
@@ -145,8 +313,72 @@ class MessageAttachment(models.Model):
     def save(self, *args, **kwargs):
         if self.file and not self.filename:
             self.filename = self.file.name
-        if self.file and self.file_size == 0:
-            self.file_size = self.file.size
         if self.file and not self.content_type:
-            self.content_type = self.file.content_type or 'application/octet-stream'
-        super().save(*args, **kwargs)
\ No newline at end of file
+            # Guessed from the name; the stored file only has a type while it is still an upload
+            self.content_type = mimetypes.guess_type(self.filename)[0] or 'application/octet-stream'
+        if self.file and not self.file_size:
+            if isinstance(self.file.storage, FileSystemStorage):
+                self.file_size = self.file.size
+            else:
+                # Sizing a remotely stored file is a network round trip; leave it to a worker
+                self.file_size = 0
+                self.processing = True
+        super().save(*args, **kwargs)
+        if self.processing:
+            from .tasks import process_attachment
+            transaction.on_commit(lambda: process_attachment.delay(self.pk))
+
+
+@receiver(post_delete, sender=Message)
+def refresh_conversation_after_message_delete(sender, instance, **kwargs):
+    """Keep the conversation's last_message_at and unread counters right after a message is deleted"""
+    Conversation.objects.filter(pk=instance.conversation_id).update(
+        last_message_at=models.Subquery(
+            Message.objects.filter(conversation_id=instance.conversation_id)
+            .order_by('-timestamp').values('timestamp')[:1]
+        )
+    )
+    UnreadCounter.recount(instance.conversation_id)
+
+
+@receiver(m2m_changed, sender=Conversation.participants.through)
+def update_participants_display(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep Conversation.participants_display in step with its participants"""
+    if reverse and action == 'pre_clear':
+        # The user's conversations can't be looked up once the rows are gone
+        instance._cleared_conversation_ids = list(instance.conversations.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        conversation_ids = [instance.pk]
+    elif action == 'post_clear':
+        conversation_ids = getattr(instance, '_cleared_conversation_ids', [])
+    else:
+        conversation_ids = pk_set or []
+    Conversation.refresh_participants_display(conversation_ids)
+
+
+# Names shown in participants_display; saving any other user field leaves it alone
+DISPLAY_NAME_FIELDS = {'first_name', 'last_name', 'username'}
+
+
+@receiver(post_save, sender=User)
+def refresh_display_after_rename(sender, instance, created, update_fields=None, **kwargs):
+    """Refresh participants_display of the user's conversations when their name may have changed"""
+    if created or (update_fields is not None and not DISPLAY_NAME_FIELDS & set(update_fields)):
+        return
+    Conversation.refresh_participants_display(list(instance.conversations.values_list('pk', flat=True)))
+
+
+@receiver(pre_delete, sender=User)
+def collect_conversations_before_user_delete(sender, instance, **kwargs):
+    """Remember the user's conversations; the cascade removes the memberships without m2m_changed"""
+    instance._display_conversation_ids = list(instance.conversations.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=User)
+def refresh_display_after_user_delete(sender, instance, **kwargs):
+    """Drop the deleted user's name from the conversations they were in"""
+    Conversation.refresh_participants_display(getattr(instance, '_display_conversation_ids', []))
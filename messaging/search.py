@@ -0,0 +1,87 @@
+"""Full-text search over users and messages.
+
+On PostgreSQL the lookups run against the tsvector GIN indexes created by
+migration 0011 and the trigram indexes of 0012; the expressions below must
+stay identical to the indexed ones or the planner falls back to a sequential
+scan. Other databases keep the plain ``icontains`` matching.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import BooleanField, ExpressionWrapper, Q, Value
+
+SEARCH_CONFIG = 'simple'  # No stemming or stop words: names and short chat messages
+USER_SEARCH_FIELDS = ('username', 'first_name', 'last_name', 'email')
+SEARCH_TERM = re.compile(r'\w+')
+
+
+def user_search_vector():
+    return SearchVector(*USER_SEARCH_FIELDS, config=SEARCH_CONFIG)
+
+
+def message_search_vector():
+    return SearchVector('content', config=SEARCH_CONFIG)
+
+
+def use_full_text_search():
+    return connection.vendor == 'postgresql'
+
+
+def prefix_search_query(text):
+    """A tsquery matching every word of `text` as a prefix, or None if it has no words"""
+    terms = SEARCH_TERM.findall(text.lower())
+    if not terms:
+        return None
+    return SearchQuery(' & '.join(f'{term}:*' for term in terms), search_type='raw', config=SEARCH_CONFIG)
+
+
+def user_substring_lookup(text):
+    """icontains on every user search field; backed by the trigram indexes of migration 0012"""
+    lookup = Q()
+    for field in USER_SEARCH_FIELDS:
+        lookup |= Q(**{f'{field}__icontains': text})
+    return lookup
+
+
+def search_users_queryset(queryset, text):
+    """Filter `queryset` of users by `text`, best matches first on PostgreSQL"""
+    query = prefix_search_query(text) if use_full_text_search() else None
+    if query is None:
+        return queryset.filter(user_substring_lookup(text))
+    # Whole-word prefixes rank first; substrings inside words still match
+    vector = user_search_vector()
+    return queryset.annotate(search=vector).filter(
+        Q(search=query) | user_substring_lookup(text)
+    ).annotate(rank=SearchRank(vector, query)).order_by('-rank', 'username')
+
+
+def search_messages_queryset(messages, text, content=True, sender=True):
+    """Keep the `messages` whose content or sender matches `text`.
+
+    Rows get `content_match` and `sender_match` flags saying which part matched.
+    Sender names are matched by substring; a conversation has few senders.
+    """
+    if not (content or sender):
+        return messages.none()
+
+    content_lookup = Q(content__icontains=text)
+    query = prefix_search_query(text) if use_full_text_search() else None
+    if query is not None:
+        messages = messages.annotate(search=message_search_vector())
+        content_lookup = Q(search=query)
+    sender_lookup = (
+        Q(sender__username__icontains=text) |
+        Q(sender__first_name__icontains=text) |
+        Q(sender__last_name__icontains=text)
+    )
+
+    lookups = Q()
+    flags = {}
+    for flag, enabled, lookup in (('content_match', content, content_lookup), ('sender_match', sender, sender_lookup)):
+        if enabled:
+            lookups |= lookup
+            flags[flag] = ExpressionWrapper(lookup, output_field=BooleanField())
+        else:
+            flags[flag] = Value(False)
+    return messages.filter(lookups).annotate(**flags)
@@ -0,0 +1,30 @@
+from celery import shared_task
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def process_attachment(attachment_id):
+    """Fill in the size of an attachment saved to remote storage"""
+    from .models import MessageAttachment
+    attachment = MessageAttachment.objects.filter(pk=attachment_id, processing=True).first()
+    if attachment is None:
+        return
+    try:
+        MessageAttachment.objects.filter(pk=attachment_id).update(
+            file_size=attachment.file.size,
+            processing=False,
+        )
+    except Exception as e:
+        logger.error(f"Failed to process attachment {attachment_id}: {e}")
+
+
+@shared_task
+def delete_stored_file(name):
+    """Remove a deleted attachment's file from (remote) storage"""
+    from django.core.files.storage import default_storage
+    try:
+        default_storage.delete(name)
+    except Exception as e:
+        logger.error(f"Failed to delete stored file {name}: {e}")
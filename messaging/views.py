@@ -1,43 +1,67 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_POST
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_http_methods, require_POST
 from django.contrib.auth import get_user_model
-from django.db.models import Q, Count, Max
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import Q, Count, F, Max, OuterRef, Prefetch, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.utils import timezone
+import hashlib
 import json
 
-from .models import Conversation, Message, MessageAttachment, Notification, UserPresence
+from .models import Conversation, Message, MessageAttachment, Notification, UnreadCounter, UserPresence
+from .search import search_messages_queryset, search_users_queryset
 
 User = get_user_model()
 
 
+def _inbox_conversations(user):
+    """The user's conversations, newest first, with everything the inbox lists render.
+
+    Each conversation gets `unread`, `other_participants` (prefetched without
+    the user) and `latest_message` (with its sender), in three queries in total.
+    """
+    conversations = list(Conversation.objects.filter(
+        participants=user
+    ).annotate(
+        unread=Coalesce(Subquery(
+            UnreadCounter.objects.filter(
+                conversation=OuterRef('pk'), user=user
+            ).values('count')[:1]
+        ), 0),
+        last_message_id=Subquery(
+            Message.objects.filter(conversation=OuterRef('pk')).order_by('-timestamp').values('id')[:1]
+        ),
+    ).order_by(F('last_message_at').desc(nulls_last=True)).prefetch_related(Prefetch(
+        'participants',
+        queryset=User.objects.exclude(id=user.id).only('id', 'username', 'first_name', 'last_name'),
+        to_attr='other_participants',
+    )))
+
+    last_messages = Message.objects.select_related('sender').in_bulk(
+        [conv.last_message_id for conv in conversations if conv.last_message_id]
+    )
+    for conv in conversations:
+        conv.latest_message = last_messages.get(conv.last_message_id)
+    return conversations
+
+
 @login_required
 def messages_view(request):
     """Main messages view showing conversations and chat interface"""
-    # Get conversations for the current user
-    conversations = Conversation.objects.filter(
-        participants=request.user
-    ).annotate(
-        last_message_time=Max('messages__timestamp'),
-        unread_count=Count(
-            'messages',
-            filter=Q(messages__read_by__isnull=True) & ~Q(messages__sender=request.user)
-        )
-    ).order_by('-last_message_time').prefetch_related('participants', 'messages')
-
     # Prepare conversation data for template
     conversations_data = []
-    for conv in conversations:
-        other_participants = conv.participants.exclude(id=request.user.id)
-        if other_participants.exists():
-            other_participant = other_participants.first()
+    for conv in _inbox_conversations(request.user):
+        if conv.other_participants:
             conversations_data.append({
                 'id': conv.id,
-                'other_participants': [other_participant],
-                'last_message': conv.last_message,
-                'unread_count': conv.unread_count,
+                'other_participants': conv.other_participants[:1],
+                'last_message': conv.latest_message,
+                'unread_count': conv.unread,
             })
 
     context = {
@@ -110,18 +134,21 @@ def send_message(request, conversation_id):
             content=content
         )
 
-        # Create notifications for other participants
-        from .models import Notification
-        other_participants = conversation.participants.exclude(id=request.user.id)
-        for participant in other_participants:
-            Notification.objects.create(
-                recipient=participant,
+        # Create notifications for other participants, in one INSERT
+        recipient_ids = conversation.participants.exclude(id=request.user.id).values_list('id', flat=True)
+        title = f'New message from {request.user.get_full_name() or request.user.username}'
+        preview = content[:100] + ('...' if len(content) > 100 else '')
+        Notification.objects.bulk_create([
+            Notification(
+                recipient_id=recipient_id,
                 sender=request.user,
                 notification_type='message',
-                title=f'New message from {request.user.get_full_name() or request.user.username}',
-                message=content[:100] + ('...' if len(content) > 100 else ''),
+                title=title,
+                message=preview,
                 conversation=conversation
             )
+            for recipient_id in recipient_ids
+        ], batch_size=500)
 
         # Broadcast message via WebSocket for real-time updates
         # This would be handled by Django Channels or similar WebSocket implementation
@@ -146,12 +173,10 @@ def search_users(request):
     if len(query) < 2:
         return JsonResponse({'users': []})
 
-    users = User.objects.filter(
-        Q(username__icontains=query) |
-        Q(first_name__icontains=query) |
-        Q(last_name__icontains=query) |
-        Q(email__icontains=query)
-    ).exclude(id=request.user.id)[:10]  # Limit results
+    users = search_users_queryset(
+        User.objects.exclude(id=request.user.id).only('id', 'username', 'first_name', 'last_name', 'email', 'role'),
+        query,
+    )[:10]  # Limit results
 
     users_data = []
     for user in users:
@@ -278,10 +303,15 @@ def delete_conversation(request, conversation_id):
         return JsonResponse({'error': str(e)}, status=500)
 
 
+MUTE_ACTIONS = {'on': 'muted', 'off': 'unmuted'}
+
+
 @login_required
 @require_POST
-def mute_conversation(request, conversation_id):
-    """Mute notifications for a conversation"""
+def set_mute(request, conversation_id, action):
+    """Mute (`action` 'on') or unmute ('off') notifications for a conversation"""
+    if action not in MUTE_ACTIONS:
+        raise Http404
     try:
         conversation = get_object_or_404(
             Conversation,
@@ -292,62 +322,76 @@ def mute_conversation(request, conversation_id):
         # For now, we'll use a simple approach - you could extend this with a proper muting model
         # Store muted conversations in user preferences or create a ConversationMute model
         muted_conversations = request.session.get('muted_conversations', [])
-        if conversation_id not in muted_conversations:
+        if action == 'on' and conversation_id not in muted_conversations:
             muted_conversations.append(conversation_id)
             request.session['muted_conversations'] = muted_conversations
+        elif action == 'off' and conversation_id in muted_conversations:
+            muted_conversations.remove(conversation_id)
+            request.session['muted_conversations'] = muted_conversations
 
         return JsonResponse({
             'success': True,
-            'message': 'Conversation muted successfully'
+            'message': f'Conversation {MUTE_ACTIONS[action]} successfully',
+            'is_muted': action == 'on',
         })
 
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
 
-@login_required
-@require_POST
-def unmute_conversation(request, conversation_id):
-    """Unmute notifications for a conversation"""
-    try:
-        conversation = get_object_or_404(
-            Conversation,
-            id=conversation_id,
-            participants=request.user
-        )
+def _is_muted(request, conversation_id):
+    return conversation_id in request.session.get('muted_conversations', [])
 
-        muted_conversations = request.session.get('muted_conversations', [])
-        if conversation_id in muted_conversations:
-            muted_conversations.remove(conversation_id)
-            request.session['muted_conversations'] = muted_conversations
 
-        return JsonResponse({
-            'success': True,
-            'message': 'Conversation unmuted successfully'
-        })
+def _etag(*values):
+    return hashlib.sha256(repr(values).encode()).hexdigest()[:32]
+
+
+def conversations_etag(request):
+    """Changes whenever the conversations list would: one aggregate over the user's conversations"""
+    if not request.user.is_authenticated:
+        return None
+    state = Conversation.objects.filter(participants=request.user).aggregate(
+        count=Count('id', distinct=True),
+        updated=Max('updated_at'),
+        last_message=Max('last_message_at'),
+        unread=Sum('unread_counters__count', filter=Q(unread_counters__user=request.user)),
+    )
+    return _etag(request.user.pk, *state.values())
 
-    except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
 
+def conversation_messages_etag(request, conversation_id):
+    """Changes with the conversation's messages, attachments, title or participants"""
+    if not request.user.is_authenticated:
+        return None
+    state = Conversation.objects.filter(id=conversation_id, participants=request.user).annotate(
+        message_count=Count('messages', distinct=True),
+        last_message_id=Max('messages__id'),
+        attachment_count=Count('messages__attachments', distinct=True),
+    ).values_list(
+        'updated_at', 'title', 'participants_display', 'message_count', 'last_message_id', 'attachment_count'
+    ).first()
+    if state is None:
+        return None  # Let the view answer 404
+    return _etag(request.user.pk, conversation_id, *state, _is_muted(request, conversation_id))
 
+
+# The polled JSON lists answer 304 Not Modified while their ETag is unchanged
 @login_required
+@cache_control(private=True, must_revalidate=True)
+@condition(etag_func=conversations_etag)
 def conversations_api(request):
     """API endpoint to get conversations list"""
-    conversations = Conversation.objects.filter(
-        participants=request.user
-    ).annotate(
-        last_message_time=Max('messages__timestamp'),
-        unread_count=Count(
-            'messages',
-            filter=Q(messages__read_by__isnull=True) & ~Q(messages__sender=request.user)
-        )
-    ).order_by('-last_message_time').prefetch_related('participants', 'messages')
+    conversations = _inbox_conversations(request.user)
+    read_ids = set(Message.read_by.through.objects.filter(
+        user=request.user, message_id__in=[conv.last_message_id for conv in conversations if conv.last_message_id]
+    ).values_list('message_id', flat=True))
 
     conversations_data = []
     for conv in conversations:
-        other_participants = conv.participants.exclude(id=request.user.id)
-        if other_participants.exists():
-            other_participant = other_participants.first()
+        if conv.other_participants:
+            other_participant = conv.other_participants[0]
+            last_message = conv.latest_message
             conversations_data.append({
                 'id': conv.id,
                 'other_participants': [{
@@ -356,19 +400,21 @@ def conversations_api(request):
                     'full_name': other_participant.get_full_name(),
                 }],
                 'last_message': {
-                    'id': conv.last_message.id if conv.last_message else None,
-                    'content': conv.last_message.content if conv.last_message else 'No messages yet',
-                    'timestamp': conv.last_message.timestamp.isoformat() if conv.last_message else None,
-                    'sender_username': conv.last_message.sender.username if conv.last_message else None,
-                    'is_read': request.user in conv.last_message.read_by.all() if conv.last_message else True,
-                } if conv.last_message else None,
-                'unread_count': conv.unread_count,
+                    'id': last_message.id,
+                    'content': last_message.content,
+                    'timestamp': last_message.timestamp.isoformat(),
+                    'sender_username': last_message.sender.username,
+                    'is_read': last_message.id in read_ids,
+                } if last_message else None,
+                'unread_count': conv.unread,
             })
 
     return JsonResponse({'conversations': conversations_data})
 
 
 @login_required
+@cache_control(private=True, must_revalidate=True)
+@condition(etag_func=conversation_messages_etag)
 def conversation_messages_api(request, conversation_id):
     """API endpoint to get messages for a conversation"""
     conversation = get_object_or_404(
@@ -377,7 +423,8 @@ def conversation_messages_api(request, conversation_id):
         participants=request.user
     )
 
-    messages = conversation.messages.all().order_by('timestamp').select_related('sender')
+    # Attachments come in one extra query for the whole page instead of one per message
+    messages = conversation.messages.all().order_by('timestamp').select_related('sender').prefetch_related('attachments')
 
     messages_data = []
     for msg in messages:
@@ -400,31 +447,34 @@ def conversation_messages_api(request, conversation_id):
             'content': msg.content,
             'timestamp': msg.timestamp.isoformat(),
             'sender_username': msg.sender.username,
-            'sender_id': msg.sender.id,
-            'is_sent': msg.sender == request.user,
+            'sender_id': msg.sender_id,
+            'is_sent': msg.sender_id == request.user.id,
             'attachments': attachments_data,
         })
 
+    participants = list(conversation.participants.all())
     participants_data = []
-    for participant in conversation.participants.all():
+    for participant in participants:
         participants_data.append({
             'id': participant.id,
             'username': participant.username,
             'full_name': participant.get_full_name(),
         })
 
+    other_names = [p.get_full_name() or p.username for p in participants if p.id != request.user.id]
     return JsonResponse({
         'conversation_id': conversation.id,
-        'title': conversation.title or f"Chat with {', '.join([p.get_full_name() or p.username for p in conversation.participants.exclude(id=request.user.id)])}",
+        'title': conversation.title or f"Chat with {', '.join(other_names)}",
         'participants': participants_data,
         'messages': messages_data,
+        'is_muted': _is_muted(request, conversation.id),
     })
 
 
 @login_required
 def notifications_api(request):
     """API endpoint to get notifications for the current user"""
-    notifications = Notification.objects.filter(recipient=request.user).select_related('sender', 'conversation')
+    notifications = Notification.objects.filter(recipient=request.user).select_related('sender')
 
     notifications_data = []
     for notification in notifications:
@@ -441,7 +491,7 @@ def notifications_api(request):
                 'username': notification.sender.username,
                 'full_name': notification.sender.get_full_name(),
             },
-            'conversation_id': notification.conversation.id if notification.conversation else None,
+            'conversation_id': notification.conversation_id,
         })
 
     return JsonResponse({
@@ -452,11 +502,15 @@ def notifications_api(request):
 
 @login_required
 def unread_notifications_api(request):
-    """API endpoint to get unread notifications for the current user"""
+    """API endpoint to get unread notifications for the current user; `?count_only=1` returns just the count"""
     notifications = Notification.objects.filter(
         recipient=request.user,
         is_read=False
-    ).select_related('sender', 'conversation').order_by('-created_at')
+    )
+    if request.GET.get('count_only'):
+        return JsonResponse({'count': notifications.count()})
+
+    notifications = notifications.select_related('sender').order_by('-created_at')
 
     notifications_data = []
     for notification in notifications[:10]:  # Limit to 10 recent notifications
@@ -471,7 +525,7 @@ def unread_notifications_api(request):
                 'username': notification.sender.username,
                 'full_name': notification.sender.get_full_name(),
             },
-            'conversation_id': notification.conversation.id if notification.conversation else None,
+            'conversation_id': notification.conversation_id,
         })
 
     return JsonResponse({
@@ -480,28 +534,16 @@ def unread_notifications_api(request):
     })
 
 
-@login_required
-def unread_notifications_count_api(request):
-    """API endpoint to get unread notifications count for the current user"""
-    count = Notification.objects.filter(recipient=request.user, is_read=False).count()
-
-    return JsonResponse({
-        'count': count
-    })
-
-
 @login_required
 def notifications_page(request):
     """View for displaying all notifications for the current user"""
     # Get all notifications for the current user
     notifications = Notification.objects.filter(
         recipient=request.user
-    ).select_related('sender', 'conversation').order_by('-created_at')
+    ).select_related('sender').order_by('-created_at')
 
     # Mark notifications as read when viewing the page
-    unread_notifications = notifications.filter(is_read=False)
-    for notification in unread_notifications:
-        notification.mark_as_read()
+    Notification.mark_all_read(request.user)
 
     context = {
         'notifications': notifications,
@@ -511,39 +553,14 @@ def notifications_page(request):
     return render(request, 'messaging/notifications.html', context)
 
 
-@login_required
-@require_POST
-def mark_notification_read(request, notification_id):
-    """Mark a specific notification as read"""
-    notification = get_object_or_404(
-        Notification,
-        id=notification_id,
-        recipient=request.user
-    )
-
-    notification.mark_as_read()
-
-    return JsonResponse({'success': True})
-
-
 @login_required
 def chat_rooms_api(request):
     """API endpoint to get chat rooms (conversations) for the current user"""
-    conversations = Conversation.objects.filter(
-        participants=request.user
-    ).annotate(
-        last_message_time=Max('messages__timestamp'),
-        unread_count=Count(
-            'messages',
-            filter=Q(messages__read_by__isnull=True) & ~Q(messages__sender=request.user)
-        )
-    ).order_by('-last_message_time').prefetch_related('participants', 'messages')
-
     rooms_data = []
-    for conv in conversations:
-        other_participants = conv.participants.exclude(id=request.user.id)
-        if other_participants.exists():
-            other_participant = other_participants.first()
+    for conv in _inbox_conversations(request.user):
+        if conv.other_participants:
+            other_participant = conv.other_participants[0]
+            last_message = conv.latest_message
             rooms_data.append({
                 'id': conv.id,
                 'participants': [{
@@ -552,9 +569,9 @@ def chat_rooms_api(request):
                     'last_name': other_participant.last_name,
                 }],
                 'last_message': {
-                    'decrypted_content': conv.last_message.content if conv.last_message else 'No messages yet',
-                    'timestamp': conv.last_message.timestamp.isoformat() if conv.last_message else None,
-                } if conv.last_message else None,
+                    'decrypted_content': last_message.content,
+                    'timestamp': last_message.timestamp.isoformat(),
+                } if last_message else None,
             })
 
     return JsonResponse({'rooms': rooms_data})
@@ -569,15 +586,15 @@ def chat_room_messages_api(request, room_id):
         participants=request.user
     )
 
-    messages = conversation.messages.all().order_by('timestamp').select_related('sender')
+    messages = conversation.messages.order_by('timestamp').values('id', 'content', 'timestamp', 'sender_id')
 
     messages_data = []
     for msg in messages:
         messages_data.append({
-            'id': msg.id,
-            'decrypted_content': msg.content,
-            'timestamp': msg.timestamp.isoformat(),
-            'sender': msg.sender.id,
+            'id': msg['id'],
+            'decrypted_content': msg['content'],
+            'timestamp': msg['timestamp'].isoformat(),
+            'sender': msg['sender_id'],
         })
 
     return JsonResponse({'messages': messages_data})
@@ -636,46 +653,6 @@ def users_api(request):
     return JsonResponse({'users': users_data})
 
 
-@login_required
-def unread_notifications_api(request):
-    """API endpoint to get unread notifications for the current user"""
-    notifications = Notification.objects.filter(
-        recipient=request.user,
-        is_read=False
-    ).select_related('sender', 'conversation').order_by('-created_at')
-
-    notifications_data = []
-    for notification in notifications[:10]:  # Limit to 10 recent notifications
-        notifications_data.append({
-            'id': notification.id,
-            'type': notification.notification_type,
-            'title': notification.title,
-            'message': notification.message,
-            'created_at': notification.created_at.isoformat(),
-            'sender': {
-                'id': notification.sender.id,
-                'username': notification.sender.username,
-                'full_name': notification.sender.get_full_name(),
-            },
-            'conversation_id': notification.conversation.id if notification.conversation else None,
-        })
-
-    return JsonResponse({
-        'notifications': notifications_data,
-        'unread_count': len(notifications_data)
-    })
-
-
-@login_required
-def unread_notifications_count_api(request):
-    """API endpoint to get unread notifications count for the current user"""
-    count = Notification.objects.filter(recipient=request.user, is_read=False).count()
-
-    return JsonResponse({
-        'count': count
-    })
-
-
 @login_required
 def search_messages(request, conversation_id):
     """Search messages within a conversation"""
@@ -694,34 +671,27 @@ def search_messages(request, conversation_id):
         search_content = request.GET.get('content', 'true').lower() == 'true'
         search_sender = request.GET.get('sender', 'true').lower() == 'true'
 
-        messages = conversation.messages.all().select_related('sender')
+        messages = search_messages_queryset(
+            conversation.messages.select_related('sender'),
+            query,
+            content=search_content,
+            sender=search_sender,
+        )
 
-        # Filter messages based on search criteria
         results = []
         for message in messages:
-            match = False
-            match_reasons = []
-
-            if search_content and query.lower() in message.content.lower():
-                match = True
-                match_reasons.append('content')
-
-            if search_sender:
-                sender_name = (message.sender.get_full_name() or message.sender.username).lower()
-                if query.lower() in sender_name:
-                    match = True
-                    match_reasons.append('sender')
-
-            if match:
-                results.append({
-                    'id': message.id,
-                    'content': message.content,
-                    'timestamp': message.timestamp.isoformat(),
-                    'sender_username': message.sender.username,
-                    'sender_full_name': message.sender.get_full_name(),
-                    'is_sent': message.sender == request.user,
-                    'match_reasons': match_reasons
-                })
+            results.append({
+                'id': message.id,
+                'content': message.content,
+                'timestamp': message.timestamp.isoformat(),
+                'sender_username': message.sender.username,
+                'sender_full_name': message.sender.get_full_name(),
+                'is_sent': message.sender_id == request.user.id,
+                'match_reasons': [
+                    reason for reason, matched in (('content', message.content_match), ('sender', message.sender_match))
+                    if matched
+                ],
+            })
 
         return JsonResponse({
             'messages': results,
@@ -733,19 +703,32 @@ def search_messages(request, conversation_id):
         return JsonResponse({'error': str(e)}, status=500)
 
 
+MAX_ATTACHMENT_SIZE = 10 * 1024 * 1024  # 10MB
+# Multipart framing and the other form fields come on top of the file itself
+MAX_UPLOAD_REQUEST_SIZE = MAX_ATTACHMENT_SIZE + 64 * 1024
+
+
 @login_required
 @require_POST
 def upload_attachment(request):
     """Upload a file attachment for a message"""
     try:
+        # Refuse oversized bodies from the declared length, before touching
+        # request.FILES makes Django read (and spool) the whole upload
+        try:
+            content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            content_length = 0
+        if content_length > MAX_UPLOAD_REQUEST_SIZE:
+            return JsonResponse({'error': 'File size too large. Maximum size is 10MB'}, status=400)
+
         if 'file' not in request.FILES:
             return JsonResponse({'error': 'No file provided'}, status=400)
 
         uploaded_file = request.FILES['file']
 
         # Validate file size (max 10MB)
-        max_size = 10 * 1024 * 1024  # 10MB
-        if uploaded_file.size > max_size:
+        if uploaded_file.size > MAX_ATTACHMENT_SIZE:
             return JsonResponse({'error': 'File size too large. Maximum size is 10MB'}, status=400)
 
         # Create a temporary message to attach the file to
@@ -789,14 +772,15 @@ def delete_attachment(request, attachment_id):
             message__sender=request.user
         )
 
-        # Store file path for deletion
-        file_path = attachment.file.path
+        file = attachment.file
         attachment.delete()
 
-        # Delete the file from storage
-        import os
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        # Delete the file from storage; remote storage is left to a worker
+        if isinstance(file.storage, FileSystemStorage):
+            file.delete(save=False)
+        else:
+            from .tasks import delete_stored_file
+            transaction.on_commit(lambda: delete_stored_file.delay(file.name))
 
         return JsonResponse({'success': True})
 
@@ -828,7 +812,8 @@ def update_presence(request):
         )
 
         if not created:
-            presence.is_online = is_online
+            # Another tab's presence socket keeps the user online
+            presence.is_online = is_online or presence.socket_count > 0
             presence.last_seen = timezone.now()
             if conversation:
                 presence.current_conversation = conversation
@@ -836,7 +821,7 @@ def update_presence(request):
 
         return JsonResponse({
             'success': True,
-            'is_online': is_online,
+            'is_online': presence.is_online,
             'last_seen': presence.last_seen.isoformat()
         })
 
@@ -878,28 +863,9 @@ def get_conversation_presence(request, conversation_id):
             participants=request.user
         )
 
-        from .models import UserPresence
-        presence_data = []
-
-        for participant in conversation.participants.exclude(id=request.user.id):
-            presence, created = UserPresence.objects.get_or_create(
-                user=participant,
-                defaults={'is_online': False}
-            )
-
-            presence_data.append({
-                'user_id': participant.id,
-                'username': participant.username,
-                'full_name': participant.get_full_name(),
-                'is_online': presence.is_online,
-                'last_seen': presence.last_seen.isoformat(),
-                'status_display': presence.status_display,
-                'current_conversation': presence.current_conversation.id if presence.current_conversation else None
-            })
-
         return JsonResponse({
             'conversation_id': conversation.id,
-            'participants_presence': presence_data
+            'participants_presence': UserPresence.participants_presence(conversation.id, request.user)
         })
 
     except Exception as e:
@@ -910,51 +876,66 @@ def get_conversation_presence(request, conversation_id):
 @require_POST
 def mark_all_notifications_read(request):
     """Mark all notifications as read for the current user"""
-    Notification.objects.filter(recipient=request.user, is_read=False).update(
-        is_read=True,
-        read_at=timezone.now()
-    )
+    Notification.mark_all_read(request.user)
 
     return JsonResponse({'success': True})
 
 
-@login_required
-@require_POST
-def mark_conversation_read(request, conversation_id):
-    """Mark all messages in a conversation as read for the current user"""
-    conversation = get_object_or_404(
-        Conversation,
-        id=conversation_id,
-        participants=request.user
-    )
-
-    # Mark all messages in this conversation as read by current user
-    unread_messages = conversation.messages.exclude(sender=request.user).exclude(read_by=request.user)
-    for message in unread_messages:
-        message.read_by.add(request.user)
+MARK_READ_LIMIT = 500  # ids per collection in one bulk_mark_read request
 
-    # Mark conversation as read in any notifications
-    from .models import Notification
-    Notification.objects.filter(
-        recipient=request.user,
-        conversation=conversation,
-        is_read=False
-    ).update(is_read=True, read_at=timezone.now())
 
-    return JsonResponse({'success': True})
+def _id_list(payload, key):
+    ids = payload.get(key) or []
+    if not isinstance(ids, list) or len(ids) > MARK_READ_LIMIT:
+        raise ValueError(f'{key} must be a list of at most {MARK_READ_LIMIT} ids')
+    return [int(pk) for pk in ids]
 
 
 @login_required
-@require_POST
-def mark_message_read(request, message_id):
-    """Mark a specific message as read"""
-    message = get_object_or_404(
-        Message,
-        id=message_id,
-        conversation__participants=request.user
-    )
+@require_http_methods(['PATCH', 'POST'])
+def bulk_mark_read(request):
+    """Mark messages, whole conversations and notifications read in one request.
 
-    if message.sender != request.user:  # Don't mark your own messages as read
-        message.read_by.add(request.user)
-
-    return JsonResponse({'success': True})
\ No newline at end of file
+    Body: {"messages": [...], "conversations": [...], "notifications": [...],
+    "all_notifications": true}; every key is optional. Each collection is one
+    bulk UPDATE/INSERT, and ids the user can't access are ignored.
+    """
+    try:
+        payload = json.loads(request.body or '{}')
+        message_ids = _id_list(payload, 'messages')
+        conversation_ids = _id_list(payload, 'conversations')
+        notification_ids = _id_list(payload, 'notifications')
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    except (AttributeError, TypeError, ValueError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    user = request.user
+    marked = {'messages': 0, 'conversations': 0, 'notifications': 0}
+
+    with transaction.atomic():
+        if message_ids:
+            marked['messages'] += Message.mark_read_by(user, Message.objects.filter(
+                id__in=message_ids, conversation__participants=user
+            ))
+
+        if conversation_ids:
+            conversation_ids = list(Conversation.objects.filter(
+                id__in=conversation_ids, participants=user
+            ).values_list('id', flat=True))
+            marked['messages'] += Message.mark_read_by(user, Message.objects.filter(
+                conversation_id__in=conversation_ids
+            ))
+            UnreadCounter.objects.filter(user=user, conversation_id__in=conversation_ids).update(count=0)
+            marked['conversations'] = len(conversation_ids)
+
+        if payload.get('all_notifications'):
+            marked['notifications'] = Notification.mark_all_read(user)
+        elif notification_ids or conversation_ids:
+            # A conversation's notifications are read along with it
+            marked['notifications'] = Notification.objects.filter(
+                Q(id__in=notification_ids) | Q(conversation_id__in=conversation_ids),
+                recipient=user, is_read=False,
+            ).update(is_read=True, read_at=timezone.now())
+
+    return JsonResponse({'success': True, **marked})
\ No newline at end of file
@@ -20,7 +20,22 @@ else:
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
 
 from django.core.asgi import get_asgi_application
+from django.urls import get_resolver
 
-# Temporarily using standard Django ASGI application
-# WebSocket support can be added later with proper chat.routing implementation
-application = get_asgi_application()
+# Django must be set up before the consumers (and their models) are imported
+django_asgi_application = get_asgi_application()
+
+from channels.auth import AuthMiddlewareStack
+from channels.routing import ProtocolTypeRouter, URLRouter
+from channels.security.websocket import AllowedHostsOriginValidator
+
+from messaging.routing import websocket_urlpatterns
+
+application = ProtocolTypeRouter({
+    'http': django_asgi_application,
+    'websocket': AllowedHostsOriginValidator(AuthMiddlewareStack(URLRouter(websocket_urlpatterns))),
+})
+
+# Import the URLconf and compile its patterns while the worker boots, so the
+# first request each worker serves doesn't pay for it
+get_resolver()._populate()
@@ -417,6 +417,24 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULE = {
+    'refresh-mood-weekly-rollup': {
+        'task': 'analytics.tasks.refresh_mood_weekly_rollup',
+        'schedule': 24 * 60 * 60,  # Nightly
+    },
+    'refresh-mood-daily-rollup': {
+        'task': 'analytics.tasks.refresh_mood_daily_rollup',
+        'schedule': 60 * 60,  # Hourly, so today's row stays current
+    },
+    'bulk-refresh-user-analytics': {
+        'task': 'analytics.tasks.bulk_refresh_user_analytics',
+        'schedule': 24 * 60 * 60,
+    },
+    'recompute-risk-scores': {
+        'task': 'analytics.tasks.recompute_risk_scores',
+        'schedule': 24 * 60 * 60,
+    },
+}
 
 # PayPal settings
 PAYPAL_CLIENT_ID = os.getenv('PAYPAL_CLIENT_ID', '')
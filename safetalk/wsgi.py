@@ -20,5 +20,10 @@ else:
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
 
 from django.core.wsgi import get_wsgi_application
+from django.urls import get_resolver
 
 application = get_wsgi_application()
+
+# Import the URLconf and compile its patterns while the worker boots, so the
+# first request each worker serves doesn't pay for it
+get_resolver()._populate()
@@ -0,0 +1,73 @@
+from asgiref.sync import sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.test import TransactionTestCase, override_settings
+
+from messaging.consumers import PresenceConsumer
+from messaging.models import Conversation, UserPresence
+
+User = get_user_model()
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class PresenceConsumerTest(TransactionTestCase):
+    """Test the presence WebSocket consumer"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='present', password='testpass123')
+        self.other = User.objects.create_user(username='watcher', password='testpass123')
+        self.conversation = Conversation.objects.create()
+        self.conversation.participants.set([self.user, self.other])
+
+    async def connect(self, user):
+        communicator = WebsocketCommunicator(PresenceConsumer.as_asgi(), '/ws/presence/')
+        communicator.scope['user'] = user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def is_online(self, user):
+        presence = await sync_to_async(UserPresence.objects.get)(user=user)
+        return presence.is_online
+
+    async def test_anonymous_user_rejected(self):
+        """Test the socket is closed for users who are not logged in"""
+        communicator = WebsocketCommunicator(PresenceConsumer.as_asgi(), '/ws/presence/')
+        communicator.scope['user'] = AnonymousUser()
+        connected, _ = await communicator.connect()
+        self.assertFalse(connected)
+
+    async def test_user_offline_after_last_socket_closes(self):
+        """Test closing one of two tabs keeps the user online"""
+        first_tab = await self.connect(self.user)
+        second_tab = await self.connect(self.user)
+        self.assertTrue(await self.is_online(self.user))
+
+        await first_tab.disconnect()
+        self.assertTrue(await self.is_online(self.user))
+
+        await second_tab.disconnect()
+        self.assertFalse(await self.is_online(self.user))
+
+    async def test_presence_pushed_to_participants(self):
+        """Test participants get presence changes and the focused conversation's presence"""
+        watcher = await self.connect(self.other)
+        communicator = await self.connect(self.user)
+
+        event = await watcher.receive_json_from()
+        self.assertEqual((event['user_id'], event['is_online']), (self.user.id, True))
+
+        await communicator.send_json_to({'type': 'focus', 'conversation_id': self.conversation.id})
+        await watcher.receive_json_from()
+        snapshot = await communicator.receive_json_from()
+        self.assertEqual(snapshot['type'], 'participants_presence')
+        self.assertEqual(
+            [(p['user_id'], p['is_online']) for p in snapshot['participants_presence']],
+            [(self.other.id, True)],
+        )
+
+        await communicator.disconnect()
+        event = await watcher.receive_json_from()
+        self.assertEqual((event['user_id'], event['is_online']), (self.user.id, False))
+        await watcher.disconnect()
@@ -9,6 +9,7 @@ from accounts.models import (
 )
 from chat.models import Message, Session, Notification
 from analytics.models import UserAnalytics, MoodAnalytics, ChatAnalytics
+from messaging import models as messaging
 
 User = get_user_model()
 
@@ -441,4 +442,102 @@ class AnalyticsModelTest(TestCase):
 
         self.assertEqual(chat_analytics.user, self.user)
         self.assertEqual(chat_analytics.total_messages_sent, 50)
-        self.assertEqual(chat_analytics.total_messages_received, 45)
\ No newline at end of file
+        self.assertEqual(chat_analytics.total_messages_received, 45)
+
+
+class UnreadCounterTest(TestCase):
+    """Test the denormalized unread counters and last message time of conversations"""
+
+    def setUp(self):
+        self.sender = User.objects.create_user(username='dm_sender', password='testpass123')
+        self.reader = User.objects.create_user(username='dm_reader', password='testpass123')
+        self.conversation = messaging.Conversation.objects.create()
+        self.conversation.participants.set([self.sender, self.reader])
+
+    def send(self, content, minutes_ago=0):
+        return messaging.Message.objects.create(
+            conversation=self.conversation,
+            sender=self.sender,
+            content=content,
+            timestamp=timezone.now() - timedelta(minutes=minutes_ago),
+        )
+
+    def test_new_message_increments_recipient_counter(self):
+        """Test only recipients' counters go up when a message is sent"""
+        self.send('first')
+        self.send('second')
+
+        self.assertEqual(self.conversation.unread_count(self.reader), 2)
+        self.assertEqual(self.conversation.unread_count(self.sender), 0)
+
+    def test_mark_read_by_decrements_counter(self):
+        """Test mark_read_by lowers the counter once per newly read message"""
+        first = self.send('first')
+        self.send('second')
+
+        marked = messaging.Message.mark_read_by(self.reader, messaging.Message.objects.filter(pk=first.pk))
+        self.assertEqual(marked, 1)
+        self.assertEqual(self.conversation.unread_count(self.reader), 1)
+
+        # Already read messages and the user's own messages are skipped
+        self.assertEqual(messaging.Message.mark_read_by(self.reader, messaging.Message.objects.filter(pk=first.pk)), 0)
+        self.assertEqual(messaging.Message.mark_read_by(self.sender, messaging.Message.objects.all()), 0)
+        self.assertEqual(self.conversation.unread_count(self.reader), 1)
+
+    def test_delete_recounts_unread_and_last_message(self):
+        """Test deleting messages updates the counters and the conversation's last message time"""
+        older = self.send('older', minutes_ago=5)
+        newest = self.send('newest')
+        messaging.Message.mark_read_by(self.reader, messaging.Message.objects.filter(pk=older.pk))
+
+        newest.delete()
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.unread_count(self.reader), 0)
+        self.assertEqual(self.conversation.last_message_at, older.timestamp)
+
+        older.delete()
+        self.conversation.refresh_from_db()
+        self.assertIsNone(self.conversation.last_message_at)
+
+    def test_deleting_sender_clears_their_messages(self):
+        """Test a user deletion cascading to their messages leaves no stale conversation state"""
+        self.send('from the deleted user')
+
+        self.sender.delete()
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.unread_count(self.reader), 0)
+        self.assertIsNone(self.conversation.last_message_at)
+
+
+class ConversationDisplayTest(TestCase):
+    """Test Conversation.participants_display follows its participants"""
+
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', first_name='Alice', last_name='Smith')
+        self.bob = User.objects.create_user(username='bob')
+        self.conversation = messaging.Conversation.objects.create()
+        self.conversation.participants.set([self.alice, self.bob])
+
+    def display(self):
+        self.conversation.refresh_from_db()
+        return self.conversation.participants_display
+
+    def test_display_lists_participants(self):
+        """Test full names are used, falling back to the username"""
+        self.assertEqual(self.display(), 'Alice Smith, bob')
+
+    def test_rename_refreshes_display(self):
+        """Test renaming a participant updates their conversations"""
+        self.bob.first_name = 'Robert'
+        self.bob.save()
+        self.assertEqual(self.display(), 'Alice Smith, Robert')
+
+        # Saves that can't change the name are skipped
+        self.bob.first_name = 'Bobby'
+        self.bob.save(update_fields=['last_login'])
+        self.assertEqual(self.display(), 'Alice Smith, Robert')
+
+    def test_deleted_user_removed_from_display(self):
+        """Test a user deleted through the cascade no longer appears in the display"""
+        self.alice.delete()
+        self.assertEqual(self.display(), 'bob')
@@ -1,11 +1,15 @@
 import json
 from django.test import TestCase, Client
 from django.contrib.auth import get_user_model
-from django.urls import reverse
+from django.core.cache import cache
+from django.urls import URLResolver, reverse
 from django.utils import timezone
 from datetime import datetime, timedelta
 from unittest.mock import patch, MagicMock
 from accounts.models import User, MoodEntry, VideoCall, SubscriptionPlan
+from analytics.caching import REALTIME_METRICS_CACHE_KEY, _local_cache
+from messaging.models import Conversation, Message, Notification, UnreadCounter
+from messaging.views import MARK_READ_LIMIT
 # from chat.models import Message, Session  # Commented out - chat app doesn't exist
 
 User = get_user_model()
@@ -309,6 +313,23 @@ class AnalyticsTest(TestCase):
         response = self.client.get(reverse('analytics_dashboard'))
         self.assertEqual(response.status_code, 200)  # Should show access denied template
 
+    def test_realtime_metrics(self):
+        """Test the real-time metrics endpoint counts recently active conversations"""
+        other_user = User.objects.create_user(
+            username='other',
+            email='other@example.com',
+            password='testpass123'
+        )
+        conversation = Conversation.objects.create()
+        conversation.participants.set([self.admin_user, other_user])
+        Message.objects.create(conversation=conversation, sender=other_user, content='Hello')
+        cache.delete(REALTIME_METRICS_CACHE_KEY)
+        _local_cache.clear()
+
+        response = self.client.get(reverse('realtime_metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['active_chat_rooms'], 1)
+
 
 class APIViewsTest(TestCase):
     """Test API views"""
@@ -416,4 +437,133 @@ class PerformanceTest(TestCase):
         self.assertEqual(response.status_code, 200)
 
         # Should handle large datasets efficiently
-        self.assertIn('mood_entries', response.context)
\ No newline at end of file
+        self.assertIn('mood_entries', response.context)
+
+
+class MessagingURLTest(TestCase):
+    """Test messaging URL configuration"""
+
+    def _named_patterns(self, patterns):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                yield from self._named_patterns(pattern.url_patterns)
+            else:
+                yield pattern
+
+    def test_unique_url_names(self):
+        """Every messaging pattern has its own name, so reverse() resolves each name to one pattern"""
+        from messaging.urls import urlpatterns
+
+        patterns = list(self._named_patterns(urlpatterns))
+        names = [pattern.name for pattern in patterns]
+        self.assertNotIn(None, names)
+        self.assertEqual(len(set(names)), len(patterns))
+
+
+class MarkReadTest(TestCase):
+    """Test the bulk mark-read endpoint"""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='reader', email='reader@example.com', password='testpass123')
+        self.sender = User.objects.create_user(username='writer', email='writer@example.com', password='testpass123')
+        self.outsider = User.objects.create_user(
+            username='outsider', email='outsider@example.com', password='testpass123'
+        )
+
+        self.conversation = Conversation.objects.create()
+        self.conversation.participants.set([self.user, self.sender])
+        self.second_conversation = Conversation.objects.create()
+        self.second_conversation.participants.set([self.user, self.sender])
+        self.other_conversation = Conversation.objects.create()
+        self.other_conversation.participants.set([self.sender, self.outsider])
+
+        self.messages = [self.send(self.conversation, f'message {i}') for i in range(3)]
+        self.second_messages = [self.send(self.second_conversation, f'second {i}') for i in range(2)]
+        self.other_message = self.send(self.other_conversation, 'not for the reader')
+
+        self.client.login(username='reader', password='testpass123')
+
+    def send(self, conversation, content):
+        return Message.objects.create(conversation=conversation, sender=self.sender, content=content)
+
+    def notify(self, recipient, conversation=None):
+        return Notification.objects.create(
+            recipient=recipient, sender=self.sender, notification_type='message',
+            title='New Message', message='You have a new message', conversation=conversation,
+        )
+
+    def mark_read(self, body):
+        return self.client.patch(
+            reverse('messaging:bulk_mark_read'),
+            data=body if isinstance(body, str) else json.dumps(body),
+            content_type='application/json',
+        )
+
+    def unread(self, conversation, user=None):
+        return UnreadCounter.objects.get(user=user or self.user, conversation=conversation).count
+
+    def test_mixed_payload(self):
+        """Test messages, whole conversations and notifications are marked read in one request"""
+        standalone = self.notify(self.user)
+        conversation_notification = self.notify(self.user, self.second_conversation)
+
+        response = self.mark_read({
+            'messages': [self.messages[0].id, self.messages[1].id],
+            'conversations': [self.second_conversation.id],
+            'notifications': [standalone.id],
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'success': True, 'messages': 4, 'conversations': 1, 'notifications': 2})
+        self.assertEqual(self.unread(self.conversation), 1)
+        self.assertEqual(self.unread(self.second_conversation), 0)
+        self.assertEqual(self.user.read_messages.count(), 4)
+        self.assertFalse(Notification.objects.filter(
+            id__in=[standalone.id, conversation_notification.id], is_read=False
+        ).exists())
+
+    def test_repeated_request_marks_nothing(self):
+        """Test messages already read are not counted or decremented again"""
+        self.mark_read({'messages': [self.messages[0].id]})
+        response = self.mark_read({'messages': [self.messages[0].id]})
+
+        self.assertEqual(response.json()['messages'], 0)
+        self.assertEqual(self.unread(self.conversation), 2)
+
+    def test_inaccessible_ids_ignored(self):
+        """Test ids of other users' messages, conversations and notifications are skipped"""
+        foreign_notification = self.notify(self.outsider, self.other_conversation)
+
+        response = self.mark_read({
+            'messages': [self.other_message.id],
+            'conversations': [self.other_conversation.id],
+            'notifications': [foreign_notification.id],
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'success': True, 'messages': 0, 'conversations': 0, 'notifications': 0})
+        self.assertFalse(self.other_message.read_by.exists())
+        self.assertEqual(self.unread(self.other_conversation, self.outsider), 1)
+        foreign_notification.refresh_from_db()
+        self.assertFalse(foreign_notification.is_read)
+
+    def test_all_notifications(self):
+        """Test all_notifications marks every unread notification of the user and no one else's"""
+        self.notify(self.user)
+        self.notify(self.user, self.conversation)
+        foreign_notification = self.notify(self.outsider)
+
+        response = self.mark_read({'all_notifications': True})
+
+        self.assertEqual(response.json()['notifications'], 2)
+        self.assertFalse(Notification.objects.filter(recipient=self.user, is_read=False).exists())
+        foreign_notification.refresh_from_db()
+        self.assertFalse(foreign_notification.is_read)
+
+    def test_invalid_bodies(self):
+        """Test bodies that are not JSON, not lists or too long are rejected"""
+        for body in ['not json', {'messages': self.messages[0].id}, {'messages': list(range(MARK_READ_LIMIT + 1))}]:
+            with self.subTest(body=body):
+                self.assertEqual(self.mark_read(body).status_code, 400)
+        self.assertEqual(self.unread(self.conversation), 3)